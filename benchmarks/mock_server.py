@@ -0,0 +1,262 @@
+import hashlib
+import io
+import json
+import random
+import re
+import threading
+import time
+import zipfile
+from collections import Counter
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlparse, parse_qs
+
+LITHIUM_WORKFLOW_ID = 920703
+LITHIUM_SHA = "0123456789abcdef0123456789abcdef01234567"
+# Downloads that download_to_file can resume; only these are dropped
+FILE_ENDPOINTS = {"modrinth:cdn", "github:artifact-zip", "fabric:maven"}
+
+
+class MockServer:
+    # Local stand-in for the Modrinth v2 API (plus its CDN), the GitHub
+    # Actions runs/artifacts API and the Fabric maven, all on one port.
+    # latency is added to every request, bandwidth (bytes/sec, 0 = unlimited)
+    # throttles response bodies, error_rate is the chance of a 503 and
+    # drop_rate the chance a file download (CDN, artifact or maven) is cut
+    # off halfway; API responses are never dropped. Range requests are
+    # honoured (with an ETag for If-Range) like a real CDN.
+
+    def __init__(self, mod_count, versions_per_mod=20, jar_size=256 * 1024,
+                 latency=0.0, bandwidth=0, error_rate=0.0, game_version="1.21.1", seed=0,
+                 drop_rate=0.0):
+        self.latency = latency
+        self.bandwidth = bandwidth
+        self.error_rate = error_rate
+        self.drop_rate = drop_rate
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+        self.requests = Counter()
+        self.bytes_sent = 0
+
+        self.slugs = [f"bench-mod-{i}" for i in range(mod_count)]
+        self.projects = {}
+        self.versions = {}
+        self.files = {}
+        for i, slug in enumerate(self.slugs):
+            version_ids = []
+            for j in range(versions_per_mod):
+                version_id = f"v{i:04d}{j:04d}"
+                version_ids.append(version_id)
+                # Only the newest version targets the benchmarked game version
+                newest = j == versions_per_mod - 1
+                # Older versions are never downloaded, so keep them tiny
+                data = self.make_jar(f"{slug}-{j}", jar_size if newest else 16, mod_id=slug)
+                path = f"/cdn/data/{slug}/{version_id}.jar"
+                self.files[path] = data
+                self.versions[version_id] = {
+                    "id": version_id,
+                    "project_id": f"p{i:04d}",
+                    "loaders": ["fabric"],
+                    "game_versions": [game_version] if newest else ["1.20.1"],
+                    "date_published": f"2024-01-01T00:{j // 60:02d}:{j % 60:02d}Z",
+                    "dependencies": [],
+                    "files": [{
+                        "url": path,
+                        "filename": f"{slug}-{j}.jar",
+                        "primary": True,
+                        "size": len(data),
+                        "hashes": {
+                            "sha1": hashlib.sha1(data).hexdigest(),
+                            "sha512": hashlib.sha512(data).hexdigest(),
+                        },
+                    }],
+                }
+            project = {
+                "id": f"p{i:04d}",
+                "slug": slug,
+                "versions": version_ids,
+                "game_versions": ["1.20.1", game_version],
+            }
+            self.projects[slug] = project
+            self.projects[project["id"]] = project
+
+        artifact = io.BytesIO()
+        with zipfile.ZipFile(artifact, "w") as z:
+            z.writestr("lithium-fabric-bench.jar", self.make_jar("lithium", jar_size, mod_id="lithium"))
+            z.writestr("lithium-fabric-bench-api.jar", b"api")
+        self.files["/artifacts/lithium.zip"] = artifact.getvalue()
+
+        installer = self.make_jar("fabric-installer", jar_size)
+        self.files["/maven/fabric-installer.jar"] = installer
+        self.files["/maven/fabric-installer.jar.sha1"] = hashlib.sha1(installer).hexdigest().encode()
+
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", 0), self.make_handler())
+        self.httpd.daemon_threads = True
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+
+    @staticmethod
+    def make_jar(name, size, mod_id=None):
+        # Incompressible but deterministic content; mod jars are real zips
+        # with a fabric.mod.json so the post-install scan sees valid mods
+        seed = hashlib.sha256(name.encode()).digest()
+        blocks = []
+        total = 0
+        counter = 0
+        while total < size:
+            block = hashlib.sha256(seed + counter.to_bytes(8, "big")).digest()
+            blocks.append(block)
+            total += len(block)
+            counter += 1
+        payload = b"".join(blocks)[:size]
+        if mod_id is None:
+            return payload
+
+        jar = io.BytesIO()
+        with zipfile.ZipFile(jar, "w") as z:
+            # Fixed timestamps keep the jar, and so its hashes, deterministic
+            info = zipfile.ZipInfo("fabric.mod.json", date_time=(2024, 1, 1, 0, 0, 0))
+            z.writestr(info, json.dumps({"schemaVersion": 1, "id": mod_id, "version": name}))
+            z.writestr(zipfile.ZipInfo("payload.bin", date_time=(2024, 1, 1, 0, 0, 0)), payload)
+        return jar.getvalue()
+
+    @property
+    def base_url(self):
+        return f"http://127.0.0.1:{self.httpd.server_port}"
+
+    @property
+    def modrinth_url(self):
+        return f"{self.base_url}/modrinth/v2"
+
+    @property
+    def github_url(self):
+        return f"{self.base_url}/github"
+
+    @property
+    def fabric_installer_url(self):
+        return f"{self.base_url}/maven/fabric-installer.jar"
+
+    def start(self):
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def reset_stats(self):
+        with self.lock:
+            self.requests.clear()
+            self.bytes_sent = 0
+
+    def stats(self):
+        with self.lock:
+            return {
+                "requests": sum(self.requests.values()),
+                "requests_by_endpoint": dict(self.requests),
+                "bytes_sent": self.bytes_sent,
+            }
+
+    def route(self, path, query):
+        # Returns (endpoint name, body bytes) or (endpoint name, None) for 404
+        if path == "/modrinth/v2/projects":
+            ids = json.loads(query["ids"][0])
+            body = [self.projects[i] for i in ids if i in self.projects]
+            return "modrinth:projects", json.dumps(body).encode()
+        if path == "/modrinth/v2/versions":
+            ids = json.loads(query["ids"][0])
+            body = []
+            for i in ids:
+                if i in self.versions:
+                    version = json.loads(json.dumps(self.versions[i]))
+                    for file in version["files"]:
+                        file["url"] = self.base_url + file["url"]
+                    body.append(version)
+            return "modrinth:versions", json.dumps(body).encode()
+        if path.startswith("/cdn/"):
+            return "modrinth:cdn", self.files.get(path)
+        runs_path = f"/github/repos/CaffeineMC/lithium-fabric/actions/workflows/{LITHIUM_WORKFLOW_ID}/runs"
+        if path == runs_path:
+            body = {"workflow_runs": [{
+                "head_sha": LITHIUM_SHA,
+                "head_branch": "develop",
+                "created_at": "2024-01-01T00:00:00Z",
+                "artifacts_url": f"{self.base_url}/github/runs/1/artifacts",
+            }]}
+            return "github:runs", json.dumps(body).encode()
+        if path == "/github/runs/1/artifacts":
+            body = {"artifacts": [{
+                "name": "build-artifacts",
+                "archive_download_url": f"{self.base_url}/artifacts/lithium.zip",
+            }]}
+            return "github:artifacts", json.dumps(body).encode()
+        if path.startswith("/artifacts/"):
+            return "github:artifact-zip", self.files.get(path)
+        if path.startswith("/maven/"):
+            return "fabric:maven", self.files.get(path)
+        return "unknown", None
+
+    def make_handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args):
+                pass
+
+            def do_GET(self):
+                url = urlparse(self.path)
+                endpoint, body = server.route(url.path, parse_qs(url.query))
+                with server.lock:
+                    server.requests[endpoint] += 1
+                    fail = server.random.random() < server.error_rate
+                    drop = endpoint in FILE_ENDPOINTS and server.random.random() < server.drop_rate
+                if server.latency:
+                    time.sleep(server.latency)
+
+                if fail or body is None:
+                    self.send_response(503 if fail else 404)
+                    self.send_header("Content-Length", "0")
+                    self.end_headers()
+                    return
+
+                etag = f'"{hashlib.sha1(body).hexdigest()}"'
+                offset = self.range_offset(etag)
+                if offset is not None and offset >= len(body):
+                    self.send_response(416)
+                    self.send_header("Content-Range", f"bytes */{len(body)}")
+                    self.send_header("Content-Length", "0")
+                    self.end_headers()
+                    return
+                if offset:
+                    self.send_response(206)
+                    self.send_header("Content-Range", f"bytes {offset}-{len(body) - 1}/{len(body)}")
+                    body = body[offset:]
+                else:
+                    self.send_response(200)
+                self.send_header("ETag", etag)
+                self.send_header("Accept-Ranges", "bytes")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+
+                end = len(body) // 2 if drop else len(body)
+                chunk_size = 64 * 1024
+                for start in range(0, end, chunk_size):
+                    chunk = body[start:min(start + chunk_size, end)]
+                    if server.bandwidth:
+                        time.sleep(len(chunk) / server.bandwidth)
+                    self.wfile.write(chunk)
+                with server.lock:
+                    server.bytes_sent += end
+                if drop:
+                    self.close_connection = True
+
+            def range_offset(self, etag):
+                match = re.match(r"bytes=(\d+)-$", self.headers.get("Range", ""))
+                if not match:
+                    return None
+                if_range = self.headers.get("If-Range")
+                if if_range is not None and if_range != etag:
+                    return None
+                return int(match.group(1))
+
+        return Handler
@@ -0,0 +1,245 @@
+import argparse
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import types
+from datetime import datetime, timezone
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_DIR = os.path.dirname(BENCH_DIR)
+RESULTS_DIR = os.path.join(BENCH_DIR, "results")
+sys.path.insert(0, BENCH_DIR)
+
+from mock_server import MockServer  # noqa: E402
+
+GAME_VERSION = "1.21.1"
+
+# Stand-in for the Fabric installer JVM: waits for the configured startup
+# time and creates the version directory install_fabric checks for
+STUB_JAVA = """import os
+import sys
+import time
+
+args = sys.argv[1:]
+loader = args[args.index("-loader") + 1]
+mc_version = args[args.index("-mcversion") + 1]
+time.sleep(float(os.environ.get("BENCH_JAVA_DELAY", "0")))
+name = f"fabric-loader-{loader}-{mc_version}"
+version_dir = os.path.join(os.environ["BENCH_MINECRAFT_DIR"], "versions", name)
+os.makedirs(version_dir, exist_ok=True)
+with open(os.path.join(version_dir, f"{name}.json"), "w") as file:
+    file.write("{}")
+"""
+
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(
+        description="Time ModDownloader.download_mods against a local mock of Modrinth, GitHub and Fabric."
+    )
+    parser.add_argument("--mods", default="5,20,50", help="Comma-separated mod list sizes")
+    parser.add_argument("--workers", default="1,4,8", help="Comma-separated download worker counts")
+    parser.add_argument("--versions-per-mod", type=int, default=20)
+    parser.add_argument("--jar-size", type=int, default=256 * 1024, help="Bytes per mod jar")
+    parser.add_argument("--latency", type=float, default=0.05, help="Seconds added to every request")
+    parser.add_argument("--bandwidth", type=int, default=0, help="Bytes/sec per response, 0 = unlimited")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of requests answered with 503")
+    parser.add_argument("--drop-rate", type=float, default=0.0, help="Fraction of file downloads cut off halfway")
+    parser.add_argument("--java-delay", type=float, default=1.0, help="Seconds the stub Fabric installer takes")
+    parser.add_argument("--output", help="Results file (default: results/<timestamp>.json)")
+    parser.add_argument("--compare", help="Earlier results file to compare against")
+    parser.add_argument("--threshold", type=float, default=0.10, help="Relative slowdown reported as a regression")
+    parser.add_argument("--case", help=argparse.SUPPRESS)
+    return parser.parse_args(argv)
+
+
+def run_case_in_process(case):
+    # Child side: point config at the mock server, run one install, report
+    sys.path.insert(0, REPO_DIR)
+    try:
+        import secret  # noqa: F401
+    except ImportError:
+        # The mock GitHub API does not check tokens
+        sys.modules["secret"] = types.SimpleNamespace(GITHUB_TOKEN="benchmark")
+
+    import config
+    config.MODRINTH_API_URL = case["modrinth_url"]
+    config.GITHUB_API_URL = case["github_url"]
+    config.FABRIC_INSTALLER_URL = case["fabric_installer_url"]
+    config.MOD_LIST = case["mod_list"]
+
+    from mod_downloader import ModDownloader
+
+    started = time.perf_counter()
+    downloader = ModDownloader(
+        GAME_VERSION, max_workers=case["workers"], minecraft_dir=case["minecraft_dir"]
+    )
+    mods = downloader.download_mods()
+    wall_time = time.perf_counter() - started
+
+    peak_rss = None
+    try:
+        import resource
+        peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        if platform.system() != "Darwin":
+            peak_rss *= 1024  # Linux reports kilobytes, macOS bytes
+    except ImportError:
+        pass
+
+    print(json.dumps({
+        "ok": mods is not None,
+        "wall_time": wall_time,
+        "peak_rss": peak_rss,
+    }))
+
+
+def write_stub_java(bin_dir):
+    script = os.path.join(bin_dir, "fake_java.py")
+    with open(script, "w") as file:
+        file.write(STUB_JAVA)
+    if os.name == "nt":
+        with open(os.path.join(bin_dir, "java.bat"), "w") as file:
+            file.write(f'@"{sys.executable}" "{script}" %*\n')
+    else:
+        java = os.path.join(bin_dir, "java")
+        with open(java, "w") as file:
+            file.write(f'#!/bin/sh\nexec "{sys.executable}" "{script}" "$@"\n')
+        os.chmod(java, 0o755)
+
+
+def run_case(server, case, env):
+    server.reset_stats()
+    output = subprocess.run(
+        [sys.executable, os.path.abspath(__file__), "--case", json.dumps(case)],
+        env=env, cwd=case["minecraft_dir"], capture_output=True, text=True,
+    )
+    if output.returncode != 0:
+        raise RuntimeError(f"Benchmark case failed:\n{output.stderr}")
+    result = json.loads(output.stdout.strip().splitlines()[-1])
+    result.update(server.stats())
+    return result
+
+
+def run_benchmarks(args):
+    results = []
+    work_dir = tempfile.mkdtemp(prefix="mcinstaller-bench-")
+    bin_dir = os.path.join(work_dir, "bin")
+    os.makedirs(bin_dir)
+    write_stub_java(bin_dir)
+
+    try:
+        for mod_count in [int(n) for n in args.mods.split(",")]:
+            server = MockServer(
+                mod_count,
+                versions_per_mod=args.versions_per_mod,
+                jar_size=args.jar_size,
+                latency=args.latency,
+                bandwidth=args.bandwidth,
+                error_rate=args.error_rate,
+                drop_rate=args.drop_rate,
+                game_version=GAME_VERSION,
+            ).start()
+            try:
+                for workers in [int(n) for n in args.workers.split(",")]:
+                    minecraft_dir = os.path.join(work_dir, f"mods{mod_count}-workers{workers}")
+                    os.makedirs(minecraft_dir)
+                    env = dict(os.environ)
+                    env["PATH"] = bin_dir + os.pathsep + env.get("PATH", "")
+                    env["BENCH_MINECRAFT_DIR"] = minecraft_dir
+                    env["BENCH_JAVA_DELAY"] = str(args.java_delay)
+                    case = {
+                        "modrinth_url": server.modrinth_url,
+                        "github_url": server.github_url,
+                        "fabric_installer_url": server.fabric_installer_url,
+                        "mod_list": server.slugs + ["lithium"],
+                        "workers": workers,
+                        "minecraft_dir": minecraft_dir,
+                    }
+                    # Cold install into an empty directory, then a rerun of
+                    # the same install to time the incremental path
+                    for scenario in ("cold", "rerun"):
+                        result = run_case(server, case, env)
+                        result.update(mods=mod_count, workers=workers, scenario=scenario)
+                        results.append(result)
+                        print(format_result(result), flush=True)
+            finally:
+                server.stop()
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+    return results
+
+
+def format_result(result):
+    rss = f"{result['peak_rss'] / (1024 * 1024):.1f} MiB" if result["peak_rss"] else "n/a"
+    return (
+        f"mods={result['mods']:<4} workers={result['workers']:<3} {result['scenario']:<6} "
+        f"{'ok' if result['ok'] else 'FAILED':<6} wall={result['wall_time']:.3f}s "
+        f"requests={result['requests']:<5} bytes={result['bytes_sent']:<10} rss={rss}"
+    )
+
+
+def case_key(result):
+    return (result["mods"], result["workers"], result["scenario"])
+
+
+def compare(baseline_path, results, threshold):
+    with open(baseline_path, "r") as file:
+        baseline = {case_key(r): r for r in json.load(file)["results"]}
+
+    regressions = 0
+    print(f"\nCompared with {baseline_path}:")
+    for result in results:
+        before = baseline.get(case_key(result))
+        if before is None:
+            continue
+        change = (result["wall_time"] - before["wall_time"]) / before["wall_time"]
+        requests = result["requests"] - before["requests"]
+        regressed = change > threshold or requests > 0
+        regressions += regressed
+        print(
+            f"mods={result['mods']:<4} workers={result['workers']:<3} {result['scenario']:<6} "
+            f"wall {change:+.1%} requests {requests:+d}{'  REGRESSION' if regressed else ''}"
+        )
+    return regressions
+
+
+def main(argv=None):
+    args = parse_args(sys.argv[1:] if argv is None else argv)
+    if args.case:
+        run_case_in_process(json.loads(args.case))
+        return 0
+
+    results = run_benchmarks(args)
+
+    output = args.output
+    if output is None:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        stamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+        output = os.path.join(RESULTS_DIR, f"{stamp}.json")
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "HEAD"], cwd=REPO_DIR, capture_output=True, text=True
+        ).stdout.strip() or None
+    except OSError:
+        commit = None
+    with open(output, "w") as file:
+        json.dump({
+            "commit": commit,
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "settings": {k: v for k, v in vars(args).items() if k not in ("case", "output", "compare")},
+            "results": results,
+        }, file, indent=4)
+    print(f"\nResults written to {output}")
+
+    if args.compare:
+        return 1 if compare(args.compare, results, args.threshold) else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
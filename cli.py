@@ -0,0 +1,206 @@
+import argparse
+import json
+import os
+import sys
+import time
+import requests
+from config import MINECRAFT_VERSIONS, MINECRAFT_VERSION, MOD_LIST, MODRINTH_API_URL, MAX_DOWNLOAD_WORKERS, OFFLINE_MODE, JAR_CACHE_DIR_NAME, INSTANCE_NAME, TRACE_FILE
+from mod_downloader import ModDownloader
+from mod_resolver import ModResolver
+from metadata_cache import MetadataCache, MetadataUnavailableError
+from jar_cache import JarCache
+from profile_manager import ProfileManager
+from profile_store import ProfileStore, ProfileStoreError
+from instrumentation import Tracer
+from lockfile import Lockfile, LockfileError
+from compatibility_matrix import CompatibilityMatrix
+from logger import logger
+
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(
+        prog="mc-installer",
+        description="Install the configured Fabric mod set without the GUI.",
+    )
+    parser.add_argument(
+        "-v", "--minecraft-version", action="append", dest="versions", metavar="VERSION",
+        help=f"Minecraft version to install (repeatable, default {MINECRAFT_VERSION})",
+    )
+    parser.add_argument(
+        "--all-versions", action="store_true",
+        help="Install every entry of MINECRAFT_VERSIONS",
+    )
+    parser.add_argument(
+        "-d", "--game-dir", action="append", dest="game_dirs", metavar="DIR",
+        help="Target .minecraft directory (repeatable, default is the platform's .minecraft)",
+    )
+    parser.add_argument(
+        "-j", "--workers", type=int, default=MAX_DOWNLOAD_WORKERS,
+        help="Mods downloaded in parallel per install",
+    )
+    parser.add_argument(
+        "--cache-dir",
+        help="Cache shared by every target (default: inside the first game directory)",
+    )
+    parser.add_argument(
+        "--list-versions", action="store_true",
+        help="Print which Minecraft versions every mod supports, without installing",
+    )
+    parser.add_argument(
+        "--skip-unavailable", action="store_true",
+        help="Skip target versions that some mods have no build for",
+    )
+    parser.add_argument("--offline", action="store_true", default=OFFLINE_MODE, help="Use cached metadata only")
+    parser.add_argument("--no-profile", action="store_true", help="Skip writing launcher profiles")
+    parser.add_argument(
+        "--instance", default=INSTANCE_NAME, metavar="NAME",
+        help=f"Instance (game directory and profile) to install into, {{version}} expands to the Minecraft version (default {INSTANCE_NAME})",
+    )
+    parser.add_argument(
+        "--lock", metavar="FILE",
+        help="Install exactly what FILE pins, without any API metadata requests",
+    )
+    parser.add_argument(
+        "--write-lock", metavar="FILE",
+        help="Write a lockfile after each successful install ({version} expands to the Minecraft version)",
+    )
+    parser.add_argument("--trace", default=TRACE_FILE, metavar="FILE", help="Append phase and request timings as JSON lines")
+    args = parser.parse_args(argv)
+    if args.lock and (args.versions or args.all_versions):
+        parser.error("--lock installs the Minecraft version recorded in the lockfile")
+    if "{version}" not in args.instance and (args.all_versions or len(args.versions or []) > 1):
+        parser.error("--instance needs a {version} placeholder when installing several versions")
+    if args.write_lock and "{version}" not in args.write_lock and (args.all_versions or len(args.versions or []) > 1):
+        parser.error("--write-lock needs a {version} placeholder when installing several versions")
+    return args
+
+
+def install(downloader, create_profile, lock_path=None, profile_store=None):
+    # Install one (game dir, version) target and describe the outcome as a dict
+    started = time.monotonic()
+    result = {
+        "minecraft_version": downloader.minecraft_version,
+        "game_dir": downloader.minecraft_dir,
+        "instance_dir": downloader.instance_dir,
+    }
+    try:
+        mods = downloader.download_mods()
+        if mods is None:
+            result.update(status="failed", error="Some mods could not be downloaded, see the log file")
+        else:
+            if create_profile:
+                ProfileManager(
+                    downloader.minecraft_version,
+                    downloader.minecraft_dir,
+                    downloader.tracer,
+                    instance_name=downloader.instance_name,
+                    instance_dir=downloader.instance_dir,
+                    profile_store=profile_store,
+                    loader_version=downloader.loader_version,
+                ).create_profile(mods)
+            if lock_path:
+                downloader.export_lockfile(lock_path)
+                result["lockfile"] = lock_path
+            result.update(status="ok", mods=sorted(os.path.basename(path) for path in mods))
+            report = downloader.scan_report or {}
+            result["problems"] = {key: report[key] for key in ("duplicates", "corrupt", "unmet_depends") if report.get(key)}
+    except Exception as e:
+        logger.exception(f"Install failed for {downloader.minecraft_version} in {downloader.minecraft_dir}")
+        result.update(status="failed", error=str(e))
+    result["seconds"] = round(time.monotonic() - started, 3)
+    summary = downloader.tracer.log_summary()
+    result["phases"] = summary["phases"]
+    result["critical_path"] = [step["name"] for step in summary["critical_path"]]
+    return result
+
+
+def main(argv=None):
+    args = parse_args(sys.argv[1:] if argv is None else argv)
+
+    lockfile = None
+    if args.lock:
+        try:
+            lockfile = Lockfile.load(args.lock)
+        except LockfileError as e:
+            logger.error(str(e))
+            return 1
+
+    if lockfile:
+        versions = [lockfile.minecraft_version]
+    elif args.all_versions:
+        versions = [v["version"] for v in MINECRAFT_VERSIONS]
+    else:
+        versions = args.versions or [MINECRAFT_VERSION]
+    game_dirs = [os.path.abspath(d) for d in args.game_dirs] if args.game_dirs else [None]
+
+    # One resolver and one set of caches for the whole run, so every target
+    # after the first reuses resolution results and already downloaded jars
+    first_dir = game_dirs[0] or ModDownloader.get_minecraft_dir()
+    cache_dir = args.cache_dir or os.path.join(first_dir, JAR_CACHE_DIR_NAME)
+    metadata_cache = MetadataCache(os.path.join(cache_dir, "metadata"), offline=args.offline)
+    resolver = ModResolver(MODRINTH_API_URL, metadata_cache=metadata_cache)
+    jar_cache = JarCache(os.path.join(cache_dir, "jars"))
+
+    # A lockfile already pins builds that exist, so it needs no matrix
+    if args.list_versions or (args.skip_unavailable and not lockfile):
+        try:
+            matrix = CompatibilityMatrix.load_or_build(resolver, MOD_LIST)
+        except (requests.RequestException, MetadataUnavailableError) as e:
+            logger.error(f"Cannot build the compatibility matrix: {str(e)}")
+            print(json.dumps({"status": "failed", "error": f"compatibility check failed: {str(e)}"}), flush=True)
+            return 1
+        if args.list_versions:
+            for v in MINECRAFT_VERSIONS:
+                missing = matrix.missing(v["version"])
+                print(json.dumps({
+                    "minecraft_version": v["version"],
+                    "installable": not missing,
+                    "missing": missing,
+                }), flush=True)
+            return 0
+
+        installable = []
+        for version in versions:
+            missing = matrix.missing(version)
+            if missing:
+                logger.warning(f"Skipping {version}, no build for: {', '.join(missing)}")
+                print(json.dumps({"minecraft_version": version, "status": "skipped", "missing": missing}), flush=True)
+            else:
+                installable.append(version)
+        versions = installable
+
+    ok = True
+    for game_dir in game_dirs:
+        # Profiles for every version in this game dir are written in one go
+        profile_store = ProfileStore(
+            os.path.join(game_dir or ModDownloader.get_minecraft_dir(), "launcher_profiles.json")
+        )
+        try:
+            with profile_store.batch():
+                for version in versions:
+                    downloader = ModDownloader(
+                        minecraft_version=version,
+                        max_workers=args.workers,
+                        offline=args.offline,
+                        minecraft_dir=game_dir,
+                        resolver=resolver,
+                        metadata_cache=metadata_cache,
+                        jar_cache=jar_cache,
+                        tracer=Tracer(args.trace),
+                        lockfile=lockfile,
+                        instance=args.instance,
+                    )
+                    lock_path = args.write_lock.format(version=version) if args.write_lock else None
+                    result = install(downloader, not args.no_profile, lock_path, profile_store)
+                    ok = ok and result["status"] == "ok"
+                    # One JSON object per line on stdout; logging goes to stderr
+                    print(json.dumps(result), flush=True)
+        except ProfileStoreError as e:
+            logger.error(str(e))
+            ok = False
+
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,92 @@
+import json
+from config import MINECRAFT_VERSIONS, METADATA_TTL_COMPATIBILITY
+from logger import logger
+
+# Minecraft version -> [version, *compatible versions], in preference order
+COMPATIBLE_VERSIONS = {v["version"]: [v["version"]] + v["compatible"] for v in MINECRAFT_VERSIONS}
+
+
+def compatible_versions(version):
+    return COMPATIBLE_VERSIONS.get(version, [version])
+
+
+class CompatibilityMatrix:
+    # Mod x game-version availability for every entry of MINECRAFT_VERSIONS.
+    # Each game version (including versions only named as "compatible") gets
+    # a bit in index; each mod is one int with a bit set per game version it
+    # has a loader build for. Whether a target version is installable is then
+    # a few ANDs per mod instead of a resolve-and-download attempt.
+
+    def __init__(self, mods, game_versions, masks):
+        self.mods = list(mods)
+        self.game_versions = list(game_versions)
+        self.index = {version: bit for bit, version in enumerate(self.game_versions)}
+        self.masks = masks  # slug -> int, 0 when the mod is unknown
+
+    @staticmethod
+    def all_game_versions():
+        versions = []
+        for candidates in COMPATIBLE_VERSIONS.values():
+            versions.extend(v for v in candidates if v not in versions)
+        return versions
+
+    @classmethod
+    def build(cls, resolver, mods, game_versions=None):
+        # One /projects call and one batched /versions round over each mod's
+        # full version list; versions already in the metadata cache are free
+        game_versions = game_versions or cls.all_game_versions()
+        matrix = cls(mods, game_versions, {})
+        projects = resolver.fetch_projects(mods)
+        version_ids = [vid for slug in mods if slug in projects for vid in projects[slug].get("versions", [])]
+        versions = resolver.fetch_versions(version_ids)
+        for slug in mods:
+            mask = 0
+            project = projects.get(slug)
+            if project is None:
+                logger.warning(f"Mod not found on Modrinth: {slug}")
+            else:
+                for version_id in project.get("versions", []):
+                    version = versions.get(version_id)
+                    if version is not None and resolver.matches(version, game_versions):
+                        mask |= matrix.mask_for(version["game_versions"])
+            matrix.masks[slug] = mask
+        return matrix
+
+    @classmethod
+    def load_or_build(cls, resolver, mods, game_versions=None):
+        # Cached as one item in the resolver's metadata cache, keyed by the
+        # mod list, version list and loader
+        game_versions = game_versions or cls.all_game_versions()
+        cache = resolver.metadata_cache
+        key = json.dumps([resolver.loader, sorted(mods), game_versions])
+        if cache:
+            data = cache.get_item("compatibility-matrix", key, METADATA_TTL_COMPATIBILITY)
+            if data is not None:
+                return cls(data["mods"], data["game_versions"], data["masks"])
+        matrix = cls.build(resolver, mods, game_versions)
+        if cache:
+            cache.put_item("compatibility-matrix", key, {
+                "mods": matrix.mods,
+                "game_versions": matrix.game_versions,
+                "masks": matrix.masks,
+            })
+        return matrix
+
+    def mask_for(self, game_versions):
+        mask = 0
+        for version in game_versions:
+            bit = self.index.get(version)
+            if bit is not None:
+                mask |= 1 << bit
+        return mask
+
+    def missing(self, minecraft_version):
+        # Mods with no build for the version or any of its compatible versions
+        target = self.mask_for(compatible_versions(minecraft_version))
+        return [slug for slug in self.mods if not self.masks.get(slug, 0) & target]
+
+    def installable(self, minecraft_version):
+        return not self.missing(minecraft_version)
+
+    def installable_versions(self):
+        return [v["version"] for v in MINECRAFT_VERSIONS if self.installable(v["version"])]
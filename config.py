@@ -3,6 +3,13 @@ from secret import GITHUB_TOKEN
 # GitHub API related constants
 GITHUB_API_URL = "https://api.github.com"
 LITHIUM_REPO = "CaffeineMC/lithium-fabric"
+LITHIUM_WORKFLOW_ID = 920703
+# Minecraft version -> lithium-fabric branch whose CI builds target it. Other
+# versions install Lithium's Modrinth release, as does a listed version when
+# that release is at least as new as the branch's latest successful build.
+LITHIUM_BRANCHES = {
+    "1.21.1": "develop",
+}
 
 # Modrinth API related constants
 MODRINTH_API_URL = "https://api.modrinth.com/v2"
@@ -69,4 +76,41 @@ MINECRAFT_VERSIONS = [
 ]
 MINECRAFT_VERSION = MINECRAFT_VERSIONS[0]["version"]  # Default to the first version in the list
 FABRIC_VERSION = "0.16.0"  # Update this to the latest Fabric version
-FABRIC_INSTALLER_URL = "https://maven.fabricmc.net/net/fabricmc/fabric-installer/1.0.1/fabric-installer-1.0.1.jar"
\ No newline at end of file
+FABRIC_INSTALLER_URL = "https://maven.fabricmc.net/net/fabricmc/fabric-installer/1.0.1/fabric-installer-1.0.1.jar"
+
+# Download engine settings
+MAX_DOWNLOAD_WORKERS = 8  # Number of mods resolved and downloaded in parallel
+MODRINTH_BULK_CHUNK_SIZE = 200  # Max ids per /projects or /versions request
+MODRINTH_VERSION_WINDOW = 10  # Newest versions per project fetched in the first resolve round
+RESOLVE_DEPENDENCIES = True  # Add required Modrinth dependencies missing from MOD_LIST
+DOWNLOAD_CHUNK_SIZE = 64 * 1024  # Bytes per chunk when streaming downloads to disk
+
+# Local jar cache, stored under the Minecraft directory so hits can be hardlinked into mods/
+JAR_CACHE_DIR_NAME = "mcinstaller-cache"
+JAR_CACHE_MAX_BYTES = 2 * 1024 * 1024 * 1024  # LRU eviction kicks in above 2 GiB
+
+# Each install gets its own game directory (and mods/) under .minecraft; jars are hardlinked from the cache
+INSTANCES_DIR_NAME = "mcinstaller-instances"
+INSTANCE_NAME = "fabric-{version}"  # Default instance name, {version} is the Minecraft version
+
+# Post-install scan of mods/ (zip central directory and fabric.mod.json only)
+SCAN_POOL_MIN_JARS = 200  # Unindexed jars needed before scanning in a process pool
+
+# HTTP session settings shared by every Modrinth, GitHub and Fabric request
+USER_AGENT = "OfficiallySp/mc-installer"  # Modrinth asks clients to send a unique User-Agent
+HTTP_TIMEOUT = (10, 60)  # (connect, read) seconds
+HTTP_RETRIES = 5  # Retries for connection errors, 429 and 5xx responses
+HTTP_BACKOFF_FACTOR = 0.5  # Exponential backoff base in seconds, jittered
+HTTP_POOL_SIZE = MAX_DOWNLOAD_WORKERS  # Keep-alive connections kept per host
+HTTP_MAX_RATE_LIMIT_WAIT = 60  # Longest pause honoured for rate-limit reset headers
+
+# Metadata cache (API responses) lifetimes in seconds; expired entries are revalidated with ETags
+METADATA_TTL_PROJECTS = 15 * 60
+METADATA_TTL_VERSIONS = 24 * 60 * 60
+METADATA_TTL_LITHIUM_RUNS = 5 * 60
+METADATA_TTL_LITHIUM_ARTIFACTS = 24 * 60 * 60
+METADATA_TTL_COMPATIBILITY = 60 * 60  # Mod x Minecraft version availability matrix
+OFFLINE_MODE = False  # Serve cached metadata only, never touching the APIs
+
+# Install tracing: phase timings and per-request stats as JSON lines (None = summary in the log only)
+TRACE_FILE = None
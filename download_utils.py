@@ -0,0 +1,200 @@
+import hashlib
+import json
+import os
+import re
+import threading
+import requests
+from config import DOWNLOAD_CHUNK_SIZE
+from jar_cache import HashMismatchError
+from http_client import get_session
+from logger import logger
+
+PART_SUFFIX = ".part"
+
+
+class DownloadCancelledError(Exception):
+    pass
+
+
+def write_atomic(dest_path, chunks, expected_hashes=None):
+    # Write an iterable of byte chunks to dest_path via a temp file in the
+    # same directory, hashing as we go. dest_path only ever appears once the
+    # content is complete and matches expected_hashes.
+    expected_hashes = {k: v.lower() for k, v in (expected_hashes or {}).items() if v}
+    digests = {algorithm: hashlib.new(algorithm) for algorithm in expected_hashes}
+
+    os.makedirs(os.path.dirname(dest_path), exist_ok=True)
+    tmp_path = f"{dest_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    try:
+        with open(tmp_path, "wb") as file:
+            for chunk in chunks:
+                if not chunk:
+                    continue
+                file.write(chunk)
+                for digest in digests.values():
+                    digest.update(chunk)
+
+        for algorithm, digest in digests.items():
+            actual = digest.hexdigest()
+            if actual != expected_hashes[algorithm]:
+                raise HashMismatchError(
+                    f"{os.path.basename(dest_path)}: expected {algorithm} "
+                    f"{expected_hashes[algorithm]}, got {actual}"
+                )
+        os.replace(tmp_path, dest_path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    return {algorithm: digest.hexdigest() for algorithm, digest in digests.items()}
+
+
+def iter_response(response, cancel_event=None, bytes_callback=None):
+    # Yield response chunks, stopping at the next chunk once cancel_event is set
+    for chunk in response.iter_content(DOWNLOAD_CHUNK_SIZE):
+        if cancel_event is not None and cancel_event.is_set():
+            raise DownloadCancelledError(f"Download cancelled: {response.url}")
+        if bytes_callback:
+            bytes_callback(len(chunk))
+        yield chunk
+
+
+def download_to_file(url, dest_path, expected_hashes=None, cancel_event=None, bytes_callback=None, **kwargs):
+    # Download through dest_path + PART_SUFFIX. An interrupted download keeps
+    # its part file, plus a small JSON note of the URL and validator, so the
+    # next attempt (in this process or a later one) only asks for the missing
+    # bytes with a Range request. Resumes in-process while each attempt makes
+    # progress.
+    part_path = f"{dest_path}{PART_SUFFIX}"
+    while True:
+        before = part_size(part_path)
+        try:
+            return resume_download(url, dest_path, part_path, expected_hashes, cancel_event, bytes_callback, **kwargs)
+        except (requests.ConnectionError, requests.exceptions.ChunkedEncodingError) as e:
+            if part_size(part_path) <= before:
+                raise
+            logger.warning(f"Download of {os.path.basename(dest_path)} interrupted, resuming: {str(e)}")
+
+
+def part_size(part_path):
+    try:
+        return os.path.getsize(part_path)
+    except OSError:
+        return 0
+
+
+def load_part_state(part_path, url):
+    # The note written when the part file was started, if it is for this URL
+    try:
+        with open(f"{part_path}.json", "r") as file:
+            state = json.load(file)
+    except (OSError, ValueError):
+        return None
+    if state.get("url") != url or not os.path.exists(part_path):
+        return None
+    return state
+
+
+def save_part_state(part_path, url, response):
+    size = response.headers.get("Content-Length")
+    state = {
+        "url": url,
+        "validator": response.headers.get("ETag") or response.headers.get("Last-Modified"),
+        "size": int(size) if size and size.isdigit() else None,
+    }
+    with open(f"{part_path}.json", "w") as file:
+        json.dump(state, file)
+
+
+def remove_part(part_path):
+    for path in (part_path, f"{part_path}.json"):
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+
+def resume_download(url, dest_path, part_path, expected_hashes, cancel_event, bytes_callback, **kwargs):
+    expected_hashes = {k: v.lower() for k, v in (expected_hashes or {}).items() if v}
+    headers = dict(kwargs.pop("headers", None) or {})
+    os.makedirs(os.path.dirname(dest_path), exist_ok=True)
+
+    state = load_part_state(part_path, url)
+    offset = part_size(part_path) if state else 0
+    resumed = bool(offset)
+    digests = {algorithm: hashlib.new(algorithm) for algorithm in expected_hashes}
+    if state and state["size"] is not None and offset >= state["size"]:
+        # Finished before a crash but never renamed into place
+        response = None
+    else:
+        if offset:
+            headers["Range"] = f"bytes={offset}-"
+            if state["validator"]:
+                headers["If-Range"] = state["validator"]
+        response = get_session().get(url, stream=True, headers=headers, **kwargs)
+
+    try:
+        if response is not None:
+            if offset and response.status_code == 206 and content_range_start(response) == offset:
+                mode = "ab"
+                hash_file(part_path, digests)
+                logger.info(f"Resuming {os.path.basename(dest_path)} at {offset} bytes")
+            elif offset and response.status_code == 416:
+                # Nothing left to send for this range; start over
+                response.close()
+                remove_part(part_path)
+                return resume_download(url, dest_path, part_path, expected_hashes, cancel_event, bytes_callback, headers=headers_without_range(headers), **kwargs)
+            else:
+                # Fresh download, or the server ignored the Range or the file changed
+                response.raise_for_status()
+                mode = "wb"
+                resumed = False
+                save_part_state(part_path, url, response)
+
+            with open(part_path, mode) as file:
+                for chunk in iter_response(response, cancel_event, bytes_callback):
+                    if not chunk:
+                        continue
+                    file.write(chunk)
+                    for digest in digests.values():
+                        digest.update(chunk)
+        else:
+            hash_file(part_path, digests)
+    finally:
+        if response is not None:
+            response.close()
+
+    for algorithm, digest in digests.items():
+        actual = digest.hexdigest()
+        if actual != expected_hashes[algorithm]:
+            remove_part(part_path)
+            if resumed:
+                # The kept bytes did not belong to this file after all
+                logger.warning(f"Resumed download of {os.path.basename(dest_path)} failed verification, restarting")
+                return resume_download(url, dest_path, part_path, expected_hashes, cancel_event, bytes_callback, headers=headers_without_range(headers), **kwargs)
+            raise HashMismatchError(
+                f"{os.path.basename(dest_path)}: expected {algorithm} "
+                f"{expected_hashes[algorithm]}, got {actual}"
+            )
+    os.replace(part_path, dest_path)
+    remove_part(part_path)
+    return {algorithm: digest.hexdigest() for algorithm, digest in digests.items()}
+
+
+def hash_file(path, digests):
+    if not digests:
+        return
+    with open(path, "rb") as file:
+        for chunk in iter(lambda: file.read(DOWNLOAD_CHUNK_SIZE), b""):
+            for digest in digests.values():
+                digest.update(chunk)
+
+
+def headers_without_range(headers):
+    return {k: v for k, v in headers.items() if k not in ("Range", "If-Range")}
+
+
+def content_range_start(response):
+    # "bytes 100-999/1000" -> 100
+    match = re.match(r"bytes (\d+)-", response.headers.get("Content-Range", ""))
+    return int(match.group(1)) if match else None
@@ -1,16 +1,15 @@
+from PyQt5.QtCore import Qt
 from PyQt5.QtWidgets import (
     QMainWindow,
     QPushButton,
     QVBoxLayout,
     QWidget,
     QLabel,
-    QApplication,
     QMessageBox,
     QProgressBar,
     QComboBox,
 )
-from mod_downloader import ModDownloader
-from profile_manager import ProfileManager
+from install_worker import InstallWorker, CompatibilityWorker
 from config import MINECRAFT_VERSIONS
 from logger import logger
 
@@ -35,10 +34,20 @@ class InstallerGUI(QMainWindow):
             self.version_selector.addItem(display_text, version)
         layout.addWidget(self.version_selector)
 
+        # Mark versions some mods have no build for once the matrix is ready
+        self.compatibility_worker = CompatibilityWorker(self)
+        self.compatibility_worker.ready.connect(self.update_compatibility)
+        self.compatibility_worker.start()
+
         self.install_button = QPushButton("Install Mods")
         self.install_button.clicked.connect(self.install_mods)
         layout.addWidget(self.install_button)
 
+        self.cancel_button = QPushButton("Cancel")
+        self.cancel_button.clicked.connect(self.cancel_install)
+        self.cancel_button.setEnabled(False)
+        layout.addWidget(self.cancel_button)
+
         self.status_label = QLabel("Ready to install mods.")
         layout.addWidget(self.status_label)
 
@@ -49,49 +58,90 @@ class InstallerGUI(QMainWindow):
         container.setLayout(layout)
         self.setCentralWidget(container)
 
-        self.profile_manager = ProfileManager(
-            MINECRAFT_VERSIONS[0]
-        )  # Use the first version as default
+        self.worker = None
+
+    def update_compatibility(self, matrix):
+        for index in range(self.version_selector.count()):
+            version = self.version_selector.itemData(index)
+            missing = matrix.missing(version)
+            if missing:
+                text = self.version_selector.itemText(index)
+                self.version_selector.setItemText(index, f"{text} - {len(missing)} mods unavailable")
+                self.version_selector.setItemData(index, f"Not available: {', '.join(missing)}", Qt.ToolTipRole)
+        logger.info(f"Fully installable versions: {', '.join(matrix.installable_versions())}")
 
     def update_progress(self, value):
         self.progress_bar.setValue(value)
-        QApplication.processEvents()
+
+    def update_mod_status(self, mod_slug, status):
+        self.status_label.setText(f"Downloading mods... ({mod_slug}: {status})")
+
+    def update_throughput(self, bytes_per_second):
+        self.status_label.setText(f"Downloading mods... {bytes_per_second / (1024 * 1024):.1f} MB/s")
 
     def install_mods(self):
         self.progress_bar.setValue(0)
         self.status_label.setText("Downloading mods...")
-        QApplication.processEvents()
 
         selected_version = self.version_selector.currentData()
         logger.info(
             f"Starting mod installation for Minecraft version: {selected_version}"
         )
 
-        downloader = ModDownloader(
-            minecraft_version=selected_version, progress_callback=self.update_progress
-        )
-        result = downloader.download_mods()
-
-        if result is None:
-            self.show_error_message(
-                "Mod Download Failed",
-                "Some mods could not be downloaded. They may not be compatible with this version of Minecraft yet, or there may be connectivity issues. Check the log file for details.",
-            )
-            self.status_label.setText("Installation failed")
-            self.progress_bar.setValue(0)
-            logger.error("Mod installation failed")
-        else:
-            self.status_label.setText("Mods downloaded successfully!")
-            self.progress_bar.setValue(75)
-            logger.info("Mods downloaded successfully")
-
-            # Create the profile
-            self.profile_manager = ProfileManager(selected_version)
-            self.profile_manager.create_profile(result)
-
-            self.status_label.setText("Profile created successfully!")
-            self.progress_bar.setValue(100)
-            logger.info("Profile created successfully")
+        # The download runs on a worker thread so the window stays responsive
+        self.worker = InstallWorker(selected_version, self)
+        self.worker.progress.connect(self.update_progress)
+        self.worker.mod_progress.connect(self.update_mod_status)
+        self.worker.throughput.connect(self.update_throughput)
+        self.worker.succeeded.connect(self.install_succeeded)
+        self.worker.failed.connect(self.install_failed)
+        self.worker.cancelled.connect(self.install_cancelled)
+        self.worker.finished.connect(self.install_finished)
+
+        self.install_button.setEnabled(False)
+        self.version_selector.setEnabled(False)
+        self.cancel_button.setEnabled(True)
+        self.worker.start()
+
+    def cancel_install(self):
+        if self.worker is not None:
+            self.status_label.setText("Cancelling...")
+            self.cancel_button.setEnabled(False)
+            self.worker.cancel()
+
+    def install_succeeded(self, result):
+        self.status_label.setText("Profile created successfully!")
+        self.progress_bar.setValue(100)
+        logger.info("Profile created successfully")
+
+    def install_failed(self, message):
+        self.show_error_message("Mod Download Failed", message)
+        self.status_label.setText("Installation failed")
+        self.progress_bar.setValue(0)
+        logger.error("Mod installation failed")
+
+    def install_cancelled(self):
+        self.status_label.setText("Installation cancelled")
+        self.progress_bar.setValue(0)
+
+    def install_finished(self):
+        self.install_button.setEnabled(True)
+        self.version_selector.setEnabled(True)
+        self.cancel_button.setEnabled(False)
+        self.worker = None
+
+    def closeEvent(self, event):
+        # A QThread destroyed while running aborts the process; cancel the
+        # install and let it roll back before the window goes away
+        if self.worker is not None:
+            self.status_label.setText("Cancelling...")
+            self.worker.cancel()
+            self.worker.wait()
+        # The matrix build cannot be interrupted, but finishes on its own
+        if self.compatibility_worker.isRunning():
+            self.status_label.setText("Finishing compatibility check...")
+            self.compatibility_worker.wait()
+        event.accept()
 
     def show_error_message(self, title, message):
         error_box = QMessageBox()
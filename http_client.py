@@ -0,0 +1,105 @@
+import random
+import threading
+import time
+from urllib.parse import urlparse
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from config import (
+    USER_AGENT,
+    HTTP_TIMEOUT,
+    HTTP_RETRIES,
+    HTTP_BACKOFF_FACTOR,
+    HTTP_POOL_SIZE,
+    HTTP_MAX_RATE_LIMIT_WAIT,
+)
+from instrumentation import record_response
+from logger import logger
+
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+
+class JitteredRetry(Retry):
+    # Spread retries out so parallel workers don't hammer the API in lockstep
+    def get_backoff_time(self):
+        return super().get_backoff_time() * random.uniform(0.5, 1.5)
+
+
+class RateLimitedAdapter(HTTPAdapter):
+    # Connection-pooling adapter that applies a default timeout and pauses a
+    # host once its rate-limit headers say the current window is used up.
+    # Modrinth sends X-Ratelimit-Reset as seconds until reset, GitHub as an
+    # epoch timestamp.
+
+    def __init__(self, timeout=HTTP_TIMEOUT, **kwargs):
+        self.timeout = timeout
+        self.blocked_until = {}
+        self.rate_limit_lock = threading.Lock()
+        super().__init__(**kwargs)
+
+    def send(self, request, **kwargs):
+        if kwargs.get("timeout") is None:
+            kwargs["timeout"] = self.timeout
+
+        host = urlparse(request.url).netloc
+        with self.rate_limit_lock:
+            wait = self.blocked_until.get(host, 0) - time.time()
+        if wait > 0:
+            logger.info(f"Rate limit reached for {host}, waiting {wait:.1f}s")
+            time.sleep(wait)
+
+        response = super().send(request, **kwargs)
+        self.track_rate_limit(host, response)
+        return response
+
+    def track_rate_limit(self, host, response):
+        remaining = response.headers.get("X-Ratelimit-Remaining")
+        reset = response.headers.get("X-Ratelimit-Reset")
+        if remaining is None or reset is None:
+            return
+        try:
+            remaining = int(remaining)
+            reset = float(reset)
+        except ValueError:
+            return
+        if remaining > 0:
+            return
+
+        now = time.time()
+        reset_at = reset if reset > now / 2 else now + reset
+        with self.rate_limit_lock:
+            self.blocked_until[host] = min(reset_at, now + HTTP_MAX_RATE_LIMIT_WAIT)
+
+
+def create_session():
+    retry = JitteredRetry(
+        total=HTTP_RETRIES,
+        backoff_factor=HTTP_BACKOFF_FACTOR,
+        status_forcelist=RETRY_STATUSES,
+        allowed_methods=frozenset(["GET", "HEAD"]),
+        respect_retry_after_header=True,
+        raise_on_status=False,
+    )
+    adapter = RateLimitedAdapter(
+        max_retries=retry,
+        pool_connections=HTTP_POOL_SIZE,
+        pool_maxsize=HTTP_POOL_SIZE,
+    )
+    session = requests.Session()
+    session.headers["User-Agent"] = USER_AGENT
+    session.hooks["response"].append(record_response)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+_session = None
+_session_lock = threading.Lock()
+
+
+def get_session():
+    global _session
+    with _session_lock:
+        if _session is None:
+            _session = create_session()
+        return _session
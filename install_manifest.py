@@ -0,0 +1,74 @@
+import json
+import os
+from jar_cache import file_digest
+from logger import logger
+
+MANIFEST_FILE_NAME = "mcinstaller-manifest.json"
+
+
+class InstallManifest:
+    def __init__(self, path, minecraft_version=None, loader_version=None, mods=None):
+        self.path = path
+        self.minecraft_version = minecraft_version
+        self.loader_version = loader_version
+        # slug -> {"version_id": ..., "filename": ..., "sha1": ..., "size": ...}
+        self.mods = mods or {}
+
+    @classmethod
+    def load(cls, path):
+        try:
+            with open(path, "r") as file:
+                data = json.load(file)
+        except FileNotFoundError:
+            return cls(path)
+        except (OSError, ValueError) as e:
+            logger.warning(f"Ignoring unreadable install manifest {path}: {str(e)}")
+            return cls(path)
+        return cls(
+            path,
+            data.get("minecraft_version"),
+            data.get("loader_version"),
+            data.get("mods", {}),
+        )
+
+    def save(self):
+        data = {
+            "minecraft_version": self.minecraft_version,
+            "loader_version": self.loader_version,
+            "mods": self.mods,
+        }
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w") as file:
+            json.dump(data, file, indent=4, sort_keys=True)
+        os.replace(tmp_path, self.path)
+
+    @staticmethod
+    def make_entry(version_id, file_path, sha1=None):
+        return {
+            "version_id": version_id,
+            "filename": os.path.basename(file_path),
+            "sha1": sha1 or file_digest(file_path, "sha1"),
+            "size": os.path.getsize(file_path),
+        }
+
+    def is_current(self, slug, version_id, download_dir):
+        # True when the recorded jar for slug is this version and still intact on disk
+        entry = self.mods.get(slug)
+        if not entry or entry.get("version_id") != version_id:
+            return False
+        file_path = os.path.join(download_dir, entry["filename"])
+        try:
+            if os.path.getsize(file_path) != entry.get("size"):
+                return False
+        except OSError:
+            return False
+        return file_digest(file_path, "sha1") == entry.get("sha1")
+
+    def stale_files(self, new_mods):
+        # Files recorded previously that the new set of entries no longer uses
+        keep = {entry["filename"] for entry in new_mods.values()}
+        return sorted(
+            entry["filename"]
+            for entry in self.mods.values()
+            if entry["filename"] not in keep
+        )
@@ -0,0 +1,100 @@
+import os
+import threading
+import time
+from PyQt5.QtCore import QThread, pyqtSignal
+from config import MOD_LIST, JAR_CACHE_DIR_NAME, OFFLINE_MODE
+from mod_downloader import ModDownloader
+from mod_resolver import ModResolver
+from metadata_cache import MetadataCache
+from compatibility_matrix import CompatibilityMatrix
+from profile_manager import ProfileManager
+from logger import logger
+
+
+class InstallWorker(QThread):
+    # Runs download_mods and profile creation off the Qt main thread.
+    # Signals emitted from download threads are queued onto the GUI thread.
+    progress = pyqtSignal(int)
+    mod_progress = pyqtSignal(str, str)  # mod slug, status
+    throughput = pyqtSignal(float)  # bytes per second
+    succeeded = pyqtSignal(list)
+    failed = pyqtSignal(str)
+    cancelled = pyqtSignal()
+
+    THROUGHPUT_INTERVAL = 0.5  # seconds between throughput updates
+
+    def __init__(self, minecraft_version, parent=None):
+        super().__init__(parent)
+        self.minecraft_version = minecraft_version
+        self.downloader = ModDownloader(
+            minecraft_version=minecraft_version,
+            progress_callback=self.progress.emit,
+            mod_callback=self.mod_progress.emit,
+            bytes_callback=self.count_bytes,
+        )
+        self.bytes_lock = threading.Lock()
+        self.window_bytes = 0
+        self.window_start = time.monotonic()
+
+    def cancel(self):
+        self.downloader.cancel()
+
+    def count_bytes(self, nbytes):
+        with self.bytes_lock:
+            self.window_bytes += nbytes
+            elapsed = time.monotonic() - self.window_start
+            if elapsed < self.THROUGHPUT_INTERVAL:
+                return
+            rate = self.window_bytes / elapsed
+            self.window_bytes = 0
+            self.window_start = time.monotonic()
+        self.throughput.emit(rate)
+
+    def run(self):
+        try:
+            result = self.downloader.download_mods()
+            # A cancel that arrives after the mods were committed is too
+            # late; finish with the profile so the install is usable
+            if result is None and self.downloader.cancel_event.is_set():
+                self.cancelled.emit()
+                return
+            if result is None:
+                self.failed.emit(
+                    "Some mods could not be downloaded. They may not be compatible with this version of Minecraft yet, or there may be connectivity issues. Check the log file for details."
+                )
+                return
+
+            self.progress.emit(75)
+            logger.info("Mods downloaded successfully")
+
+            # Create the profile
+            profile_manager = ProfileManager(
+                self.minecraft_version,
+                tracer=self.downloader.tracer,
+                instance_name=self.downloader.instance_name,
+                instance_dir=self.downloader.instance_dir,
+                loader_version=self.downloader.loader_version,
+            )
+            profile_manager.create_profile(result)
+            self.progress.emit(100)
+            self.succeeded.emit(result)
+        except Exception as e:
+            logger.exception("Installation failed")
+            self.failed.emit(str(e))
+        finally:
+            self.downloader.tracer.log_summary()
+
+
+class CompatibilityWorker(QThread):
+    # Loads (or builds) the mod x version matrix off the Qt main thread so
+    # the version selector can mark versions that cannot be fully installed
+    ready = pyqtSignal(object)
+
+    def run(self):
+        try:
+            cache_dir = os.path.join(ModDownloader.get_minecraft_dir(), JAR_CACHE_DIR_NAME)
+            metadata_cache = MetadataCache(os.path.join(cache_dir, "metadata"), offline=OFFLINE_MODE)
+            resolver = ModResolver(metadata_cache=metadata_cache)
+            self.ready.emit(CompatibilityMatrix.load_or_build(resolver, MOD_LIST))
+        except Exception:
+            logger.exception("Could not build the compatibility matrix")
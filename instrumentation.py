@@ -0,0 +1,162 @@
+import json
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from urllib.parse import urlparse
+from logger import logger
+
+# Phases that make up an install pipeline; per-mod and sub-phases are
+# recorded with a parent and reported inside their top-level phase
+TOP_LEVEL_PHASES = ("resolve", "download", "fabric-install", "manifest-write", "scan", "profile-write")
+
+_active_tracer = None
+
+
+def set_active_tracer(tracer):
+    # The shared HTTP session reports every response to the active tracer
+    global _active_tracer
+    _active_tracer = tracer
+
+
+def record_response(response, *args, **kwargs):
+    # requests response hook, installed by http_client.create_session
+    tracer = _active_tracer
+    if tracer is not None:
+        tracer.record_request(response)
+
+
+class Tracer:
+    # Collects phase timings and per-request network stats for one or more
+    # installs. Events are kept in memory and, when trace_file is given,
+    # appended to it as JSON lines as they happen.
+
+    def __init__(self, trace_file=None):
+        self.trace_file = trace_file
+        self.lock = threading.Lock()
+        self.origin = time.perf_counter()
+        self.events = []
+
+    def now(self):
+        return time.perf_counter() - self.origin
+
+    def emit(self, event):
+        with self.lock:
+            self.events.append(event)
+            if self.trace_file:
+                with open(self.trace_file, "a") as file:
+                    file.write(json.dumps(event) + "\n")
+
+    @contextmanager
+    def phase(self, name, parent=None, **attrs):
+        start = self.now()
+        status = "ok"
+        try:
+            yield attrs
+        except BaseException:
+            status = "error"
+            raise
+        finally:
+            end = self.now()
+            self.emit({
+                "type": "phase",
+                "name": name,
+                "parent": parent,
+                "start": round(start, 6),
+                "end": round(end, 6),
+                "duration": round(end - start, 6),
+                "status": status,
+                "thread": threading.current_thread().name,
+                **attrs,
+            })
+
+    def record_request(self, response):
+        # Streamed bodies are not read here; Content-Length gives their size
+        size = response.headers.get("Content-Length")
+        end = self.now()
+        elapsed = response.elapsed.total_seconds()
+        self.emit({
+            "type": "request",
+            "method": response.request.method,
+            "url": response.url,
+            "host": urlparse(response.url).netloc,
+            "status": response.status_code,
+            "bytes": int(size) if size and size.isdigit() else None,
+            "start": round(end - elapsed, 6),
+            "elapsed": round(elapsed, 6),
+            "thread": threading.current_thread().name,
+        })
+
+    def summary(self):
+        with self.lock:
+            events = list(self.events)
+        phases = [e for e in events if e["type"] == "phase"]
+        requests = [e for e in events if e["type"] == "request"]
+
+        top_level = [p for p in phases if p["parent"] is None and p["name"] in TOP_LEVEL_PHASES]
+        by_host = defaultdict(lambda: {"requests": 0, "bytes": 0, "elapsed": 0.0, "statuses": defaultdict(int)})
+        for request in requests:
+            host = by_host[request["host"]]
+            host["requests"] += 1
+            host["bytes"] += request["bytes"] or 0
+            host["elapsed"] += request["elapsed"]
+            host["statuses"][str(request["status"])] += 1
+
+        slowest_children = {}
+        for p in phases:
+            if p["parent"] is not None:
+                current = slowest_children.get(p["parent"])
+                if current is None or p["duration"] > current["duration"]:
+                    slowest_children[p["parent"]] = p
+
+        return {
+            "type": "summary",
+            "wall_time": round(max((p["end"] for p in top_level), default=0.0), 6),
+            "phases": {p["name"]: p["duration"] for p in top_level},
+            "critical_path": [
+                {
+                    "name": p["name"],
+                    "duration": p["duration"],
+                    "slowest_step": slowest_children[p["name"]]["name"] if p["name"] in slowest_children else None,
+                }
+                for p in self.critical_path(top_level)
+            ],
+            "hosts": {
+                name: {**stats, "elapsed": round(stats["elapsed"], 6), "statuses": dict(stats["statuses"])}
+                for name, stats in by_host.items()
+            },
+        }
+
+    @staticmethod
+    def critical_path(phases):
+        # Walk back from the phase that finished last, each time stepping to
+        # the phase that finished last before the current one started. With
+        # Fabric running beside resolve+download this picks whichever branch
+        # actually held up the install.
+        if not phases:
+            return []
+        path = [max(phases, key=lambda p: p["end"])]
+        while True:
+            earlier = [
+                p for p in phases
+                if p["end"] <= path[-1]["start"] + 1e-6 and all(p is not q for q in path)
+            ]
+            if not earlier:
+                break
+            path.append(max(earlier, key=lambda p: p["end"]))
+        return list(reversed(path))
+
+    def log_summary(self):
+        summary = self.summary()
+        if self.trace_file:
+            self.emit(summary)
+        logger.info(f"Install took {summary['wall_time']:.2f}s")
+        for step in summary["critical_path"]:
+            slowest = f" (slowest: {step['slowest_step']})" if step["slowest_step"] else ""
+            logger.info(f"  critical path: {step['name']} {step['duration']:.2f}s{slowest}")
+        for host, stats in summary["hosts"].items():
+            logger.info(
+                f"  {host}: {stats['requests']} requests, {stats['bytes']} bytes, "
+                f"{stats['elapsed']:.2f}s waiting for responses"
+            )
+        return summary
@@ -0,0 +1,134 @@
+import hashlib
+import os
+import shutil
+import threading
+from config import JAR_CACHE_MAX_BYTES
+from logger import logger
+
+# Preferred digest first; Modrinth returns both in files[].hashes
+HASH_ALGORITHMS = ("sha512", "sha1")
+
+
+class HashMismatchError(Exception):
+    pass
+
+
+def file_digest(path, algorithm):
+    digest = hashlib.new(algorithm)
+    with open(path, "rb") as file:
+        for chunk in iter(lambda: file.read(1024 * 1024), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def link_or_copy(src, dest):
+    # Place src at dest atomically, sharing the inode when the filesystem allows it
+    os.makedirs(os.path.dirname(dest), exist_ok=True)
+    tmp_path = f"{dest}.{os.getpid()}.{threading.get_ident()}.tmp"
+    try:
+        try:
+            os.link(src, tmp_path)
+        except OSError:
+            shutil.copyfile(src, tmp_path)
+        os.replace(tmp_path, dest)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+class JarCache:
+    def __init__(self, cache_dir, max_bytes=JAR_CACHE_MAX_BYTES):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.lock = threading.Lock()
+
+    @staticmethod
+    def key_for(hashes):
+        for algorithm in HASH_ALGORITHMS:
+            if hashes.get(algorithm):
+                return algorithm, hashes[algorithm].lower()
+        return None
+
+    def path_for(self, hashes):
+        key = self.key_for(hashes)
+        if key is None:
+            return None
+        algorithm, digest = key
+        return os.path.join(self.cache_dir, algorithm, digest[:2], digest)
+
+    def get(self, hashes):
+        cached_path = self.path_for(hashes)
+        if cached_path is None or not os.path.isfile(cached_path):
+            return None
+        # Entries share their inode with the mods/ jars they were linked
+        # into, so anything writing to such a jar in place rewrites the
+        # entry too. Re-check the digest the entry is named after.
+        algorithm, expected = self.key_for(hashes)
+        try:
+            actual = file_digest(cached_path, algorithm)
+        except OSError:
+            return None
+        if actual != expected:
+            logger.warning(f"Jar cache entry {cached_path} no longer matches its {algorithm}, discarding it")
+            try:
+                os.remove(cached_path)
+            except OSError as e:
+                logger.error(f"Error removing {cached_path}: {str(e)}")
+            return None
+        # Bump the mtime so eviction treats this entry as recently used
+        try:
+            os.utime(cached_path)
+        except OSError:
+            pass
+        return cached_path
+
+    def link_into(self, hashes, dest_path):
+        cached_path = self.get(hashes)
+        if cached_path is None:
+            return False
+        link_or_copy(cached_path, dest_path)
+        return True
+
+    def store(self, src_path, hashes, verify=True):
+        cached_path = self.path_for(hashes)
+        if cached_path is None:
+            return None
+        if verify:
+            algorithm, expected = self.key_for(hashes)
+            actual = file_digest(src_path, algorithm)
+            if actual != expected:
+                raise HashMismatchError(
+                    f"{os.path.basename(src_path)}: expected {algorithm} {expected}, got {actual}"
+                )
+        if not os.path.isfile(cached_path):
+            link_or_copy(src_path, cached_path)
+            self.evict()
+        return cached_path
+
+    def entries(self):
+        for root, _, files in os.walk(self.cache_dir):
+            for name in files:
+                if name.endswith(".tmp"):
+                    continue
+                path = os.path.join(root, name)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                yield path, stat.st_size, stat.st_mtime
+
+    def evict(self):
+        # Drop least recently used entries until the cache fits under max_bytes
+        with self.lock:
+            entries = sorted(self.entries(), key=lambda entry: entry[2])
+            total = sum(size for _, size, _ in entries)
+            for path, size, _ in entries:
+                if total <= self.max_bytes:
+                    break
+                try:
+                    os.remove(path)
+                    total -= size
+                    logger.debug(f"Evicted from jar cache: {path}")
+                except OSError as e:
+                    logger.error(f"Error evicting {path}: {str(e)}")
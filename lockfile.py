@@ -0,0 +1,55 @@
+import json
+import os
+
+LOCKFILE_VERSION = 1
+
+
+class LockfileError(Exception):
+    pass
+
+
+class Lockfile:
+    # Exact artifacts for one install: every mod (Modrinth files and the
+    # Lithium CI artifact) and the Fabric installer, with URLs, sizes and
+    # hashes. Installing from a lockfile needs no API metadata calls.
+    #
+    # mods: slug -> {"source": "modrinth" | "github", "version_id", "url",
+    #                "filename", "size", "hashes": {"sha1": ..., ...}}
+    # fabric_installer: {"url", "sha1"}
+
+    def __init__(self, minecraft_version, loader_version, fabric_installer, mods):
+        self.minecraft_version = minecraft_version
+        self.loader_version = loader_version
+        self.fabric_installer = fabric_installer
+        self.mods = mods
+
+    @classmethod
+    def load(cls, path):
+        try:
+            with open(path, "r") as file:
+                data = json.load(file)
+        except (OSError, ValueError) as e:
+            raise LockfileError(f"Cannot read lockfile {path}: {str(e)}")
+        if data.get("lockfile_version") != LOCKFILE_VERSION:
+            raise LockfileError(
+                f"Unsupported lockfile version {data.get('lockfile_version')} in {path}"
+            )
+        return cls(
+            data["minecraft_version"],
+            data["loader_version"],
+            data["fabric_installer"],
+            data["mods"],
+        )
+
+    def save(self, path):
+        data = {
+            "lockfile_version": LOCKFILE_VERSION,
+            "minecraft_version": self.minecraft_version,
+            "loader_version": self.loader_version,
+            "fabric_installer": self.fabric_installer,
+            "mods": self.mods,
+        }
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w") as file:
+            json.dump(data, file, indent=4, sort_keys=True)
+        os.replace(tmp_path, path)
@@ -1,10 +1,18 @@
+import multiprocessing
 import sys
-from PyQt5.QtWidgets import QApplication
-from gui import InstallerGUI
 from logger import logger
 
 
 def main():
+    # Any arguments select the headless CLI; PyQt is only imported for the GUI
+    if len(sys.argv) > 1:
+        from cli import main as cli_main
+
+        sys.exit(cli_main(sys.argv[1:]))
+
+    from PyQt5.QtWidgets import QApplication
+    from gui import InstallerGUI
+
     logger.info("Starting Minecraft Mod Installer")
     app = QApplication(sys.argv)
     installer = InstallerGUI()
@@ -13,4 +21,6 @@ def main():
 
 
 if __name__ == "__main__":
+    # The post-install jar scan may use a process pool, also in frozen builds
+    multiprocessing.freeze_support()
     main()
@@ -0,0 +1,96 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from urllib.parse import urlencode
+import requests
+from http_client import get_session
+from logger import logger
+
+
+class MetadataUnavailableError(Exception):
+    pass
+
+
+class MetadataCache:
+    # On-disk cache for JSON API responses. Entries keep the ETag and
+    # Last-Modified validators so expired ones are revalidated with a
+    # conditional request; a 304 only refreshes the timestamp. In offline
+    # mode, or when the network is unreachable, stale entries are served.
+
+    def __init__(self, cache_dir, offline=False):
+        self.cache_dir = cache_dir
+        self.offline = offline
+
+    def path_for(self, key):
+        digest = hashlib.sha256(key.encode("utf-8")).hexdigest()
+        return os.path.join(self.cache_dir, digest[:2], f"{digest}.json")
+
+    def load(self, key):
+        try:
+            with open(self.path_for(key), "r") as file:
+                return json.load(file)
+        except (OSError, ValueError):
+            return None
+
+    def save(self, key, entry):
+        path = self.path_for(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "w") as file:
+            json.dump(entry, file)
+        os.replace(tmp_path, path)
+
+    def get_item(self, namespace, item_id, ttl):
+        # Objects fetched by id in bulk (e.g. a Modrinth version) cached one by one
+        entry = self.load(f"{namespace}:{item_id}")
+        if entry is None or not (self.offline or time.time() - entry["fetched_at"] < ttl):
+            return None
+        return entry["body"]
+
+    def put_item(self, namespace, item_id, body):
+        self.save(f"{namespace}:{item_id}", {"fetched_at": time.time(), "body": body})
+
+    def get_json(self, url, ttl, params=None, headers=None):
+        key = f"{url}?{urlencode(sorted((params or {}).items()))}"
+        entry = self.load(key)
+        now = time.time()
+
+        if entry is not None and (self.offline or now - entry["fetched_at"] < ttl):
+            return entry["body"]
+        if self.offline:
+            raise MetadataUnavailableError(f"Offline and not cached: {key}")
+
+        request_headers = dict(headers or {})
+        if entry is not None:
+            if entry.get("etag"):
+                request_headers["If-None-Match"] = entry["etag"]
+            if entry.get("last_modified"):
+                request_headers["If-Modified-Since"] = entry["last_modified"]
+
+        try:
+            response = get_session().get(url, params=params, headers=request_headers)
+        except requests.RequestException as e:
+            if entry is None:
+                raise
+            logger.warning(f"Serving cached response for {url}: {str(e)}")
+            return entry["body"]
+
+        if response.status_code == 304 and entry is not None:
+            entry["fetched_at"] = now
+            self.save(key, entry)
+            return entry["body"]
+        if response.status_code >= 500 and entry is not None:
+            logger.warning(f"Serving cached response for {url}: HTTP {response.status_code}")
+            return entry["body"]
+        response.raise_for_status()
+
+        body = response.json()
+        self.save(key, {
+            "fetched_at": now,
+            "etag": response.headers.get("ETag"),
+            "last_modified": response.headers.get("Last-Modified"),
+            "body": body,
+        })
+        return body
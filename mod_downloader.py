@@ -1,36 +1,88 @@
-import requests
 import os
 import platform
 import subprocess
 import shutil
 import re
+import threading
 import zipfile
-import io
-from config import MODRINTH_API_URL, MOD_LIST, FABRIC_INSTALLER_URL, FABRIC_VERSION, MINECRAFT_VERSIONS, GITHUB_API_URL, LITHIUM_REPO, GITHUB_TOKEN
+import requests
+from concurrent.futures import ThreadPoolExecutor, CancelledError, as_completed
+from config import MODRINTH_API_URL, MOD_LIST, FABRIC_INSTALLER_URL, FABRIC_VERSION, GITHUB_API_URL, LITHIUM_REPO, LITHIUM_WORKFLOW_ID, LITHIUM_BRANCHES, GITHUB_TOKEN, MAX_DOWNLOAD_WORKERS, JAR_CACHE_DIR_NAME, INSTANCES_DIR_NAME, INSTANCE_NAME, DOWNLOAD_CHUNK_SIZE, METADATA_TTL_LITHIUM_RUNS, METADATA_TTL_LITHIUM_ARTIFACTS, OFFLINE_MODE, RESOLVE_DEPENDENCIES, TRACE_FILE
+from mod_resolver import ModResolver, DependencyConflictError
+from jar_cache import JarCache, file_digest
+from download_utils import download_to_file, write_atomic, DownloadCancelledError, PART_SUFFIX
+from install_manifest import InstallManifest, MANIFEST_FILE_NAME
+from lockfile import Lockfile
+from metadata_cache import MetadataCache, MetadataUnavailableError
+from http_client import get_session
+from instrumentation import Tracer, set_active_tracer
+from compatibility_matrix import compatible_versions
+from mod_scanner import ModScanner
 from logger import logger
 
+# Lithium build records (head_sha -> jar hash) never go stale
+LITHIUM_BUILD_TTL = float("inf")
+
+
 class ModNotFoundError(Exception):
     pass
 
 
 class ModDownloader:
-    def __init__(self, minecraft_version, progress_callback=None):
+    def __init__(self, minecraft_version, progress_callback=None, max_workers=None, offline=OFFLINE_MODE,
+                 mod_callback=None, bytes_callback=None, minecraft_dir=None, resolver=None,
+                 metadata_cache=None, jar_cache=None, tracer=None, lockfile=None, instance=None):
         self.api_url = MODRINTH_API_URL
         self.mod_list = MOD_LIST
-        self.minecraft_dir = self.get_minecraft_dir()
-        self.download_dir = os.path.join(self.minecraft_dir, "mods")
+        self.minecraft_dir = minecraft_dir or self.get_minecraft_dir()
         self.minecraft_version = minecraft_version
+        # Mods go into the instance's own game directory; Fabric, the
+        # launcher profiles and the caches stay shared in minecraft_dir
+        self.instance_name = (instance or INSTANCE_NAME).format(version=minecraft_version)
+        self.instance_dir = self.get_instance_dir(self.minecraft_dir, self.instance_name)
+        self.download_dir = os.path.join(self.instance_dir, "mods")
         self.compatible_versions = self.get_compatible_versions(minecraft_version)
         self.progress_callback = progress_callback
-        self.loader_version = FABRIC_VERSION
+        # mod_callback(slug, status) runs on the calling thread as each mod
+        # finishes; bytes_callback(n) runs on worker threads per chunk received
+        self.mod_callback = mod_callback
+        self.bytes_callback = bytes_callback
+        self.cancel_event = threading.Event()
+        # Stops the Fabric stage; set by cancel() and when the mod stage fails
+        self.fabric_abort_event = threading.Event()
+        # With a lockfile every artifact is pinned and no metadata is fetched
+        self.lockfile = lockfile
+        self.loader_version = lockfile.loader_version if lockfile else FABRIC_VERSION
+        self.max_workers = max(1, max_workers or MAX_DOWNLOAD_WORKERS)
+        # Caches and the resolver can be shared between downloaders (see cli.py)
+        cache_dir = os.path.join(self.minecraft_dir, JAR_CACHE_DIR_NAME)
+        self.metadata_cache = metadata_cache or MetadataCache(os.path.join(cache_dir, "metadata"), offline=offline)
+        self.resolver = resolver or ModResolver(self.api_url, metadata_cache=self.metadata_cache)
+        self.jar_cache = jar_cache or JarCache(os.path.join(cache_dir, "jars"))
+        self.manifest_path = os.path.join(self.instance_dir, MANIFEST_FILE_NAME)
+        self.manifest = InstallManifest(self.manifest_path)
+        self.fabric_installed = False
+        # What this install used, for export_lockfile
+        self.lock_entries = {}
+        self.fabric_installer = None
+        self.scan_report = None
+        self.tracer = tracer or Tracer(TRACE_FILE)
+
+    def cancel(self):
+        # Abort in-flight downloads at their next chunk; download_mods then rolls back
+        logger.info("Cancelling installation")
+        self.cancel_event.set()
+        self.fabric_abort_event.set()
 
     def get_compatible_versions(self, version):
-        for v in MINECRAFT_VERSIONS:
-            if v["version"] == version:
-                return [version] + v["compatible"]
-        return [version]
+        return compatible_versions(version)
+
+    @staticmethod
+    def get_instance_dir(minecraft_dir, instance_name):
+        return os.path.join(minecraft_dir, INSTANCES_DIR_NAME, instance_name)
 
-    def get_minecraft_dir(self):
+    @staticmethod
+    def get_minecraft_dir():
         system = platform.system()
         if system == "Windows":
             return os.path.join(os.getenv("APPDATA"), ".minecraft")
@@ -41,33 +93,31 @@ class ModDownloader:
 
     def download_mods(self):
         logger.info(f"Downloading mods for Minecraft version: {self.minecraft_version}")
-        self.install_fabric()
+        set_active_tracer(self.tracer)
+        self.manifest = InstallManifest.load(self.manifest_path)
         downloaded_mods = []
+        kept_mods = []
         unavailable_mods = []
+        manifest_entries = {}
+        self.lock_entries = {}
+
+        # Fabric runs as its own pipeline stage next to mod resolution and
+        # download; the two join here before anything is committed.
+        with ThreadPoolExecutor(max_workers=1) as fabric_executor:
+            fabric_future = fabric_executor.submit(self.install_fabric)
+            self.fetch_mods(downloaded_mods, kept_mods, unavailable_mods, manifest_entries)
+            if unavailable_mods:
+                # The install will be rolled back; don't wait for the JVM
+                self.fabric_abort_event.set()
+            fabric_error = fabric_future.exception()
+
+        if self.cancel_event.is_set():
+            logger.warning("Installation cancelled")
+            self.cleanup_downloads(downloaded_mods)
+            return None
 
-        total_mods = len(self.mod_list)
-        for index, mod_slug in enumerate(self.mod_list):
-            try:
-                logger.info(f"Downloading mod: {mod_slug}")
-                
-                if mod_slug == "lithium":
-                    file_path = self.download_lithium()
-                else:
-                    file_path = self.download_from_modrinth(mod_slug)
-
-                if file_path:
-                    downloaded_mods.append(file_path)
-                else:
-                    unavailable_mods.append(mod_slug)
-
-                # Update progress
-                if self.progress_callback:
-                    progress = (index + 1) / total_mods * 75
-                    self.progress_callback(int(progress))
-
-            except Exception as e:
-                logger.error(f"Error downloading {mod_slug}: {str(e)}")
-                unavailable_mods.append(mod_slug)
+        if fabric_error and not isinstance(fabric_error, DownloadCancelledError):
+            logger.error(f"Error installing Fabric: {str(fabric_error)}")
 
         if unavailable_mods:
             logger.warning("\nError: Some mods could not be downloaded.")
@@ -77,77 +127,304 @@ class ModDownloader:
             for mod in unavailable_mods:
                 logger.warning(f"- {mod}")
 
+        if unavailable_mods or fabric_error:
             self.cleanup_downloads(downloaded_mods)
             return None
 
-        return downloaded_mods
-
-    def download_from_modrinth(self, mod_slug):
-        # Get project information
-        project_url = f"{self.api_url}/project/{mod_slug}"
-        project_response = requests.get(project_url)
-        project_response.raise_for_status()
-        project_data = project_response.json()
-
-        # Get versions for the specific Minecraft version and Fabric loader
-        versions_url = f'{self.api_url}/project/{mod_slug}/version?game_versions=["{self.minecraft_version}"]&loaders=["fabric"]'
-        versions_response = requests.get(versions_url)
-        versions_response.raise_for_status()
-        versions_data = versions_response.json()
-
-        if not versions_data:
-            # If no exact match, try compatible versions
-            versions_url = f'{self.api_url}/project/{mod_slug}/version?game_versions={self.compatible_versions}&loaders=["fabric"]'
-            versions_response = requests.get(versions_url)
-            versions_response.raise_for_status()
-            versions_data = versions_response.json()
-
-        if not versions_data:
-            logger.warning(f"No compatible version found for {mod_slug}")
-            return None
+        with self.tracer.phase("manifest-write"):
+            self.remove_stale_mods(manifest_entries)
+            self.manifest.minecraft_version = self.minecraft_version
+            self.manifest.loader_version = self.loader_version
+            self.manifest.mods = manifest_entries
+            self.manifest.save()
+
+        # Check what actually ended up in mods/, including jars added by hand.
+        # The install is committed at this point; the scan only reports.
+        with self.tracer.phase("scan"):
+            try:
+                self.scan_report = ModScanner(self.download_dir).scan()
+                ModScanner.log_report(self.scan_report)
+            except Exception as e:
+                logger.error(f"Error scanning {self.download_dir}: {str(e)}")
+                self.scan_report = None
+
+        if kept_mods:
+            logger.info(f"{len(kept_mods)} mods already up to date, {len(downloaded_mods)} downloaded")
+        return kept_mods + downloaded_mods
+
+    def export_lockfile(self, path):
+        # Pin exactly what the last successful download_mods installed
+        if self.fabric_installer is None:
+            self.fabric_installer = self.fabric_installer_source()
+        url, hashes = self.fabric_installer
+        lockfile = Lockfile(
+            self.minecraft_version,
+            self.loader_version,
+            {"url": url, "sha1": hashes["sha1"]},
+            dict(self.lock_entries),
+        )
+        lockfile.save(path)
+        logger.info(f"Wrote lockfile: {path}")
+        return lockfile
+
+    def fetch_mods(self, downloaded_mods, kept_mods, unavailable_mods, manifest_entries):
+        if self.lockfile:
+            # Everything is pinned; go straight to the downloads
+            resolved = dict(self.lockfile.mods)
+            install_slugs = list(resolved)
+            install = self.install_locked_mod
+        else:
+            # Resolve every Modrinth mod up front with a handful of bulk
+            # requests. Lithium is included since its Modrinth release may be
+            # used instead of a CI build (see choose_lithium_source).
+            modrinth_slugs = list(self.mod_list)
+            with self.tracer.phase("resolve", mods=len(modrinth_slugs)):
+                try:
+                    resolved = self.resolver.resolve(modrinth_slugs, self.compatible_versions)
+                    if RESOLVE_DEPENDENCIES:
+                        resolved.update(self.resolver.resolve_dependencies(resolved, self.compatible_versions))
+                except DependencyConflictError as e:
+                    # Nothing has been downloaded yet; fail before touching mods/
+                    logger.error(str(e))
+                    unavailable_mods.extend(sorted({slug for pair in e.conflicts for slug in pair}))
+                    return
+                except Exception as e:
+                    logger.error(f"Error resolving mods: {str(e)}")
+                    unavailable_mods.extend(modrinth_slugs)
+                    return
+
+            unavailable_mods.extend(
+                slug for slug, version in resolved.items() if version is None and slug != "lithium"
+            )
+            install_slugs = self.mod_list + [slug for slug in resolved if slug not in self.mod_list]
+            install = self.install_mod
+
+        total_mods = len(install_slugs)
+        completed = len(unavailable_mods)
+        # Fetch mods in parallel; results are collected on the calling
+        # thread so progress_callback never runs on a worker thread.
+        with self.tracer.phase("download", workers=self.max_workers):
+            with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+                futures = {
+                    executor.submit(install, mod_slug, resolved.get(mod_slug)): mod_slug
+                    for mod_slug in install_slugs
+                    if mod_slug not in unavailable_mods
+                }
+                for future in as_completed(futures):
+                    mod_slug = futures[future]
+                    status = "failed"
+                    try:
+                        file_path, entry, reused = future.result()
+                        if not file_path:
+                            unavailable_mods.append(mod_slug)
+                        elif reused:
+                            kept_mods.append(file_path)
+                            manifest_entries[mod_slug] = entry
+                            status = "up to date"
+                        else:
+                            downloaded_mods.append(file_path)
+                            manifest_entries[mod_slug] = entry
+                            status = "downloaded"
+                    except (DownloadCancelledError, CancelledError):
+                        # CancelledError: the future was cancelled before it started
+                        unavailable_mods.append(mod_slug)
+                        status = "cancelled"
+                    except Exception as e:
+                        logger.error(f"Error downloading {mod_slug}: {str(e)}")
+                        unavailable_mods.append(mod_slug)
+
+                    if self.cancel_event.is_set():
+                        for pending in futures:
+                            pending.cancel()
+
+                    # Update progress
+                    completed += 1
+                    if self.mod_callback:
+                        self.mod_callback(mod_slug, status)
+                    if self.progress_callback:
+                        progress = completed / total_mods * 75
+                        self.progress_callback(int(progress))
+
+    def install_mod(self, mod_slug, version=None):
+        # Returns (file_path, manifest_entry, reused_existing_file)
+        with self.tracer.phase(f"mod:{mod_slug}", parent="download") as attrs:
+            run = None
+            if mod_slug == "lithium":
+                version, run = self.choose_lithium_source(version)
+                if version is None and run is None:
+                    return None, None, False
+            version_id = run["head_sha"] if run else version["id"]
+
+            if self.manifest.is_current(mod_slug, version_id, self.download_dir):
+                entry = self.manifest.mods[mod_slug]
+                logger.info(f"Up to date: {entry['filename']}")
+                attrs["outcome"] = "up to date"
+                file_path = os.path.join(self.download_dir, entry["filename"])
+                reused = True
+            else:
+                logger.info(f"Downloading mod: {mod_slug}")
+                if run:
+                    file_path = self.download_lithium(run)
+                else:
+                    file_path = self.download_from_modrinth(mod_slug, version)
+                if not file_path:
+                    return None, None, False
+                attrs.update(outcome="downloaded", bytes=os.path.getsize(file_path))
+                entry = InstallManifest.make_entry(version_id, file_path)
+                reused = False
+
+            if run:
+                self.lock_entries[mod_slug] = {
+                    "source": "github",
+                    "version_id": version_id,
+                    "url": self.lithium_artifact_url(run),
+                    "filename": entry["filename"],
+                    "size": entry["size"],
+                    "hashes": {"sha1": entry["sha1"]},
+                }
+            else:
+                mod_file = self.resolver.primary_file(version)
+                self.lock_entries[mod_slug] = {
+                    "source": "modrinth",
+                    "version_id": version_id,
+                    "url": mod_file["url"],
+                    "filename": mod_file["filename"],
+                    "size": mod_file.get("size"),
+                    "hashes": mod_file.get("hashes", {}),
+                }
+            return file_path, entry, reused
+
+    def install_locked_mod(self, mod_slug, locked):
+        # Lockfile counterpart of install_mod: the URL and hashes are already
+        # known, so this only downloads (or reuses) and verifies the file
+        with self.tracer.phase(f"mod:{mod_slug}", parent="download") as attrs:
+            version_id = locked["version_id"]
+            hashes = locked["hashes"]
+            entry = self.manifest.mods.get(mod_slug)
+            if (
+                self.manifest.is_current(mod_slug, version_id, self.download_dir)
+                and entry["sha1"] == hashes.get("sha1", entry["sha1"])
+            ):
+                logger.info(f"Up to date: {entry['filename']}")
+                attrs["outcome"] = "up to date"
+                self.lock_entries[mod_slug] = locked
+                return os.path.join(self.download_dir, entry["filename"]), entry, True
+
+            file_path = os.path.join(self.download_dir, locked["filename"])
+            if self.jar_cache.link_into(hashes, file_path):
+                logger.info(f"Using cached: {locked['filename']}")
+            elif locked["source"] == "github":
+                logger.info(f"Downloading mod: {mod_slug}")
+                if not self.extract_lithium(locked["url"], file_path, hashes):
+                    return None, None, False
+                self.jar_cache.store(file_path, hashes, verify=False)
+            else:
+                logger.info(f"Downloading mod: {mod_slug}")
+                download_to_file(locked["url"], file_path, hashes, self.cancel_event, self.bytes_callback)
+                self.jar_cache.store(file_path, hashes, verify=False)
+
+            attrs.update(outcome="downloaded", bytes=os.path.getsize(file_path))
+            self.lock_entries[mod_slug] = locked
+            return file_path, InstallManifest.make_entry(version_id, file_path, hashes.get("sha1")), False
+
+    def remove_stale_mods(self, manifest_entries):
+        # Delete jars from a previous install that are no longer part of the
+        # set, and partial downloads nothing will resume now that all succeeded
+        stale_files = self.manifest.stale_files(manifest_entries)
+        if os.path.isdir(self.download_dir):
+            stale_files += [
+                f for f in os.listdir(self.download_dir)
+                if f.endswith(PART_SUFFIX) or f.endswith(f"{PART_SUFFIX}.json")
+            ]
+        for file_name in stale_files:
+            file_path = os.path.join(self.download_dir, file_name)
+            try:
+                os.remove(file_path)
+                logger.info(f"Removed outdated mod: {file_path}")
+            except FileNotFoundError:
+                pass
+            except OSError as e:
+                logger.error(f"Error removing {file_path}: {str(e)}")
 
-        # Get the latest version
-        latest_version = versions_data[0]
+    def download_from_modrinth(self, mod_slug, version=None):
+        if version is None:
+            version = self.resolver.resolve([mod_slug], self.compatible_versions)[mod_slug]
+        if version is None:
+            return None
 
         # Download the mod file
-        file_url = latest_version["files"][0]["url"]
-        file_name = latest_version["files"][0]["filename"]
+        mod_file = self.resolver.primary_file(version)
+        file_url = mod_file["url"]
+        file_name = mod_file["filename"]
         file_path = os.path.join(self.download_dir, file_name)
+        hashes = mod_file.get("hashes", {})
 
-        response = requests.get(file_url)
-        response.raise_for_status()
+        if self.jar_cache.link_into(hashes, file_path):
+            logger.info(f"Using cached: {file_name}")
+            return file_path
 
-        os.makedirs(self.download_dir, exist_ok=True)
-        with open(file_path, "wb") as file:
-            file.write(response.content)
+        # Streamed and verified before it is renamed into mods/
+        download_to_file(file_url, file_path, hashes, self.cancel_event, self.bytes_callback)
+        self.jar_cache.store(file_path, hashes, verify=False)
 
         logger.info(f"Downloaded: {file_name}")
         return file_path
 
-    def download_lithium(self):
-        # Use the specific workflow ID
-        workflow_id = 920703
-        runs_url = f"{GITHUB_API_URL}/repos/{LITHIUM_REPO}/actions/workflows/{workflow_id}/runs?status=success"
-        headers = {
+    def lithium_headers(self):
+        return {
             "Accept": "application/vnd.github+json",
             "Authorization": f"token {GITHUB_TOKEN}",
             "X-GitHub-Api-Version": "2022-11-28"
         }
-        runs_response = requests.get(runs_url, headers=headers)
-        runs_response.raise_for_status()
-        runs_data = runs_response.json()
 
-        if not runs_data["workflow_runs"]:
-            logger.error("No successful Lithium builds found")
+    def choose_lithium_source(self, modrinth_version=None):
+        # Returns (modrinth_version, None) to install Lithium's Modrinth
+        # release or (None, ci_run) to install a CI build. GitHub is only
+        # asked when a branch is configured for this Minecraft version, and
+        # even then the Modrinth release wins once it is as new as the build.
+        branch = LITHIUM_BRANCHES.get(self.minecraft_version)
+        if branch is None:
+            if modrinth_version is None:
+                logger.error(f"No Lithium release on Modrinth and no CI branch for {self.minecraft_version}")
+            return modrinth_version, None
+
+        try:
+            run = self.find_lithium_run(branch)
+        except (requests.RequestException, MetadataUnavailableError) as e:
+            # GitHub being down or rate limited must not cost the install
+            # its Lithium when Modrinth has a release to fall back on
+            if modrinth_version is None:
+                raise
+            logger.warning(f"Cannot check Lithium CI builds, using the Modrinth release: {str(e)}")
+            return modrinth_version, None
+        exact = modrinth_version is not None and self.minecraft_version in modrinth_version["game_versions"]
+        if exact and (run is None or modrinth_version["date_published"] >= run["created_at"]):
+            logger.info("Lithium's Modrinth release is current, skipping the CI build")
+            return modrinth_version, None
+        if run is None:
+            return modrinth_version, None
+        return None, run
+
+    def find_lithium_run(self, branch):
+        # Newest successful CI run on branch, or None
+        runs_url = f"{GITHUB_API_URL}/repos/{LITHIUM_REPO}/actions/workflows/{LITHIUM_WORKFLOW_ID}/runs"
+        runs_data = self.metadata_cache.get_json(
+            runs_url,
+            METADATA_TTL_LITHIUM_RUNS,
+            params={"status": "success", "branch": branch},
+            headers=self.lithium_headers(),
+        )
+        runs = [run for run in runs_data["workflow_runs"] if run.get("head_branch", branch) == branch]
+        if not runs:
+            logger.error(f"No successful Lithium builds found on {branch}")
             return None
+        return runs[0]
 
-        latest_run = runs_data["workflow_runs"][0]
-
-        # Get the artifacts for the latest successful run
-        artifacts_url = latest_run["artifacts_url"]
-        artifacts_response = requests.get(artifacts_url, headers=headers)
-        artifacts_response.raise_for_status()
-        artifacts_data = artifacts_response.json()
+    def find_lithium_artifact(self, run):
+        # Get the artifacts for the run
+        artifacts_data = self.metadata_cache.get_json(
+            run["artifacts_url"], METADATA_TTL_LITHIUM_ARTIFACTS, headers=self.lithium_headers()
+        )
 
         if not artifacts_data["artifacts"]:
             logger.error("No artifacts found for the latest Lithium build")
@@ -159,30 +436,61 @@ class ModDownloader:
             logger.error("Lithium build artifact not found")
             return None
 
-        # Download the artifact
-        download_url = build_artifact["archive_download_url"]
-        response = requests.get(download_url, headers=headers)
-        response.raise_for_status()
-
-        # Extract the correct JAR file from the zip
-        with zipfile.ZipFile(io.BytesIO(response.content)) as z:
-            jar_files = [f for f in z.namelist() if f.endswith('.jar') and not f.endswith('-api.jar') and not f.endswith('-api-dev.jar')]
-            if not jar_files:
-                logger.error("No suitable JAR file found in the artifact")
-                return None
-            
-            jar_file = jar_files[0]  # Assume the first suitable JAR is the one we want
-            jar_content = z.read(jar_file)
-
-        # Save the JAR file
-        file_name = f"lithium-fabric-mc{self.minecraft_version}-{latest_run['head_sha'][:7]}.jar"
+        return build_artifact
+
+    def lithium_artifact_url(self, run):
+        build = self.metadata_cache.get_item("lithium-build", run["head_sha"], LITHIUM_BUILD_TTL)
+        if build is not None:
+            return build["artifact_url"]
+        artifact = self.find_lithium_artifact(run)
+        return artifact["archive_download_url"] if artifact else None
+
+    def download_lithium(self, run):
+        file_name = f"lithium-fabric-mc{self.minecraft_version}-{run['head_sha'][:7]}.jar"
         file_path = os.path.join(self.download_dir, file_name)
 
-        os.makedirs(self.download_dir, exist_ok=True)
-        with open(file_path, "wb") as file:
-            file.write(jar_content)
+        # Builds are immutable, so a head_sha seen before maps straight to a
+        # jar in the jar cache without touching the artifacts API
+        build = self.metadata_cache.get_item("lithium-build", run["head_sha"], LITHIUM_BUILD_TTL)
+        if build is not None and self.jar_cache.link_into({"sha1": build["sha1"]}, file_path):
+            logger.info(f"Using cached Lithium build: {file_name}")
+            return file_path
+
+        artifact = self.find_lithium_artifact(run)
+        if artifact is None:
+            return None
+        if not self.extract_lithium(artifact["archive_download_url"], file_path):
+            return None
+
+        sha1 = file_digest(file_path, "sha1")
+        self.jar_cache.store(file_path, {"sha1": sha1}, verify=False)
+        self.metadata_cache.put_item("lithium-build", run["head_sha"], {
+            "sha1": sha1,
+            "artifact_url": artifact["archive_download_url"],
+        })
+        return file_path
 
-        logger.info(f"Downloaded Lithium: {file_name}")
+    def extract_lithium(self, download_url, file_path, expected_hashes=None):
+        # Download the artifact zip next to the jar; an interrupted download
+        # resumes from its .part file on the next attempt
+        zip_path = f"{file_path}.zip"
+        download_to_file(download_url, zip_path, None, self.cancel_event, self.bytes_callback, headers=self.lithium_headers())
+
+        # Extract the correct JAR file straight from the zip
+        try:
+            with zipfile.ZipFile(zip_path) as z:
+                jar_files = [f for f in z.namelist() if f.endswith('.jar') and not f.endswith('-api.jar') and not f.endswith('-api-dev.jar')]
+                if not jar_files:
+                    logger.error("No suitable JAR file found in the artifact")
+                    return None
+
+                jar_file = jar_files[0]  # Assume the first suitable JAR is the one we want
+                with self.tracer.phase("extract", parent="mod:lithium"), z.open(jar_file) as member:
+                    write_atomic(file_path, iter(lambda: member.read(DOWNLOAD_CHUNK_SIZE), b""), expected_hashes)
+        finally:
+            os.remove(zip_path)
+
+        logger.info(f"Downloaded Lithium: {os.path.basename(file_path)}")
         return file_path
 
     def cleanup_downloads(self, downloaded_mods):
@@ -198,25 +506,50 @@ class ModDownloader:
             shutil.rmtree(self.download_dir)
             logger.info(f"Removed empty directory: {self.download_dir}")
 
-        # Remove Fabric
-        fabric_version = f"fabric-loader-{FABRIC_VERSION}-{self.minecraft_version}"
-        fabric_dir = os.path.join(self.minecraft_dir, "versions", fabric_version)
-        if os.path.exists(fabric_dir):
+        # Remove Fabric, unless it was already there before this run
+        fabric_dir = self.fabric_version_dir()
+        if self.fabric_installed and os.path.exists(fabric_dir):
             shutil.rmtree(fabric_dir)
             logger.info(f"Removed Fabric: {fabric_dir}")
 
-    def install_fabric(self):
-        installer_path = os.path.join(self.minecraft_dir, "fabric-installer.jar")
+    def fabric_version_dir(self):
+        fabric_version = f"fabric-loader-{self.loader_version}-{self.minecraft_version}"
+        return os.path.join(self.minecraft_dir, "versions", fabric_version)
 
-        # Download Fabric installer
-        response = requests.get(FABRIC_INSTALLER_URL)
-        response.raise_for_status()
-        with open(installer_path, "wb") as file:
-            file.write(response.content)
+    def fabric_installer_source(self):
+        # (url, hashes) of the Fabric installer. Maven publishes a .sha1 next
+        # to every artifact; a lockfile already carries it.
+        if self.lockfile:
+            installer = self.lockfile.fabric_installer
+            return installer["url"], {"sha1": installer["sha1"]}
+        sha1_response = get_session().get(f"{FABRIC_INSTALLER_URL}.sha1")
+        sha1_response.raise_for_status()
+        return FABRIC_INSTALLER_URL, {"sha1": sha1_response.text.split()[0]}
 
-        # Run Fabric installer
-        subprocess.run(
-            [
+    def install_fabric(self):
+        with self.tracer.phase("fabric-install"):
+            fabric_dir = self.fabric_version_dir()
+            if os.path.exists(os.path.join(fabric_dir, f"{os.path.basename(fabric_dir)}.json")):
+                logger.info(f"Fabric already installed: {fabric_dir}")
+                return
+
+            installer_path = os.path.join(self.minecraft_dir, "fabric-installer.jar")
+
+            # Download Fabric installer, or reuse it from the jar cache keyed
+            # by its sha1
+            self.fabric_installer = self.fabric_installer_source()
+            installer_url, hashes = self.fabric_installer
+
+            if self.jar_cache.link_into(hashes, installer_path):
+                logger.info("Using cached Fabric installer")
+            else:
+                with self.tracer.phase("fabric-download", parent="fabric-install"):
+                    download_to_file(installer_url, installer_path, hashes, self.fabric_abort_event, self.bytes_callback)
+                self.jar_cache.store(installer_path, hashes, verify=False)
+
+            # Run Fabric installer; from here on a rollback removes what it created
+            self.fabric_installed = True
+            command = [
                 "java",
                 "-jar",
                 installer_path,
@@ -227,8 +560,22 @@ class ModDownloader:
                 "-mcversion",
                 self.minecraft_version,
             ]
-        )
-
-        # Clean up
-        os.remove(installer_path)
-        logger.info("Fabric installed successfully")
\ No newline at end of file
+            try:
+                # Poll rather than block so a cancel or failed mod stage can stop the JVM
+                with self.tracer.phase("fabric-jvm", parent="fabric-install"):
+                    process = subprocess.Popen(command)
+                    while True:
+                        try:
+                            returncode = process.wait(timeout=0.5)
+                            break
+                        except subprocess.TimeoutExpired:
+                            if self.fabric_abort_event.is_set():
+                                process.terminate()
+                                process.wait()
+                                raise DownloadCancelledError("Fabric install stopped")
+                if returncode != 0:
+                    raise subprocess.CalledProcessError(returncode, command)
+            finally:
+                # Clean up
+                os.remove(installer_path)
+            logger.info("Fabric installed successfully")
@@ -0,0 +1,225 @@
+import json
+import threading
+from config import MODRINTH_API_URL, MODRINTH_BULK_CHUNK_SIZE, MODRINTH_VERSION_WINDOW, METADATA_TTL_PROJECTS, METADATA_TTL_VERSIONS
+from http_client import get_session
+from metadata_cache import MetadataUnavailableError
+from logger import logger
+
+
+class DependencyConflictError(Exception):
+    def __init__(self, conflicts):
+        # conflicts: list of (slug, incompatible_slug) pairs
+        self.conflicts = conflicts
+        pairs = ", ".join(f"{a} is incompatible with {b}" for a, b in conflicts)
+        super().__init__(f"Incompatible mods selected: {pairs}")
+
+
+class ModResolver:
+    def __init__(self, api_url=MODRINTH_API_URL, loader="fabric", metadata_cache=None):
+        self.api_url = api_url
+        self.loader = loader
+        self.metadata_cache = metadata_cache
+        self.chunk_size = MODRINTH_BULK_CHUNK_SIZE
+        self.version_window = MODRINTH_VERSION_WINDOW
+        # Results memoised per (slugs, game_versions) so batch installs resolve once
+        self.results = {}
+        self.results_lock = threading.Lock()
+
+    def resolve(self, mod_slugs, game_versions):
+        # Turn a list of slugs into {slug: version} using the bulk endpoints.
+        # game_versions[0] is the preferred version, the rest are fallbacks.
+        # Slugs with no usable version map to None.
+        key = (tuple(mod_slugs), tuple(game_versions))
+        with self.results_lock:
+            if key in self.results:
+                return dict(self.results[key])
+
+        resolved = self.resolve_uncached(mod_slugs, game_versions)
+        with self.results_lock:
+            self.results[key] = resolved
+        return dict(resolved)
+
+    def resolve_uncached(self, mod_slugs, game_versions, projects=None):
+        # mod_slugs may also be project ids; projects can be passed in when
+        # the caller already fetched them
+        resolved = {slug: None for slug in mod_slugs}
+        if not mod_slugs:
+            return resolved
+
+        if projects is None:
+            projects = self.fetch_projects(mod_slugs)
+        pending = {}
+        for slug in mod_slugs:
+            project = projects.get(slug)
+            if project is None:
+                logger.warning(f"Mod not found on Modrinth: {slug}")
+                continue
+            if not set(project.get("game_versions", [])) & set(game_versions):
+                continue
+            # Modrinth lists version ids oldest first
+            pending[slug] = list(reversed(project.get("versions", [])))
+
+        # Fetch the newest few versions of every project in one batch, and
+        # widen the window only for projects that have no exact match yet.
+        # The number of rounds depends on how far back the match is, not on
+        # how many mods are being resolved.
+        offset = 0
+        window = self.version_window
+        while pending:
+            batch = {slug: ids[offset:offset + window] for slug, ids in pending.items()}
+            versions = self.fetch_versions([vid for ids in batch.values() for vid in ids])
+
+            for slug, ids in batch.items():
+                for version_id in ids:
+                    version = versions.get(version_id)
+                    if version is None or not self.matches(version, game_versions):
+                        continue
+                    current = resolved[slug]
+                    if current is None or self.rank(version, game_versions) > self.rank(current, game_versions):
+                        resolved[slug] = version
+
+            offset += window
+            window *= 2
+            for slug in list(pending):
+                version = resolved[slug]
+                exact = version is not None and game_versions[0] in version["game_versions"]
+                if exact or offset >= len(pending[slug]):
+                    del pending[slug]
+
+        for slug in mod_slugs:
+            if slug in projects and resolved[slug] is None:
+                logger.warning(f"No compatible version found for {slug}")
+        return resolved
+
+    def resolve_dependencies(self, resolved, game_versions):
+        # Expand the required dependencies of the resolved versions
+        # transitively, one graph level at a time so each level costs one
+        # batched round of /projects and /versions calls. Returns the added
+        # {slug: version} (None when no compatible version exists) and raises
+        # DependencyConflictError if the final set contains incompatible mods.
+        selected = {
+            version["project_id"]: (slug, version)
+            for slug, version in resolved.items()
+            if version is not None
+        }
+        added = {}
+        frontier = [version for _, version in selected.values()]
+        while frontier:
+            required_by = {}
+            pinned = {}
+            for version in frontier:
+                requirer = selected.get(version["project_id"], (version["project_id"],))[0]
+                for dependency in version.get("dependencies", []):
+                    if dependency.get("dependency_type") != "required":
+                        continue
+                    project_id = dependency.get("project_id")
+                    if project_id:
+                        required_by.setdefault(project_id, requirer)
+                    elif dependency.get("version_id"):
+                        pinned[dependency["version_id"]] = requirer
+
+            if pinned:
+                # Dependencies declared only by version id: find their projects
+                for version_id, version in self.fetch_versions(list(pinned)).items():
+                    required_by.setdefault(version["project_id"], pinned[version_id])
+
+            # Projects already in the set are not expanded again; this dedups
+            # shared dependencies and stops dependency cycles
+            wanted = [project_id for project_id in required_by if project_id not in selected]
+            if not wanted:
+                break
+
+            projects = self.fetch_projects(wanted)
+            level = self.resolve_uncached(wanted, game_versions, projects)
+            frontier = []
+            for project_id in wanted:
+                slug = projects[project_id]["slug"] if project_id in projects else project_id
+                version = level[project_id]
+                selected[project_id] = (slug, version)
+                added[slug] = version
+                if version is not None:
+                    logger.info(f"Adding required dependency {slug} (needed by {required_by[project_id]})")
+                    frontier.append(version)
+
+        self.check_conflicts(selected)
+        return added
+
+    @staticmethod
+    def check_conflicts(selected):
+        version_owners = {
+            version["id"]: slug for slug, version in selected.values() if version is not None
+        }
+        conflicts = []
+        for slug, version in selected.values():
+            if version is None:
+                continue
+            for dependency in version.get("dependencies", []):
+                if dependency.get("dependency_type") != "incompatible":
+                    continue
+                other = selected.get(dependency.get("project_id"))
+                if other is not None and other[1] is not None:
+                    conflicts.append((slug, other[0]))
+                elif dependency.get("version_id") in version_owners:
+                    conflicts.append((slug, version_owners[dependency["version_id"]]))
+        if conflicts:
+            raise DependencyConflictError(conflicts)
+
+    def matches(self, version, game_versions):
+        return (
+            self.loader in version.get("loaders", [])
+            and bool(set(version.get("game_versions", [])) & set(game_versions))
+            and bool(version.get("files"))
+        )
+
+    def rank(self, version, game_versions):
+        # Higher is better: exact game version first, then newest
+        # (ISO-8601 timestamps compare correctly as strings)
+        exact = game_versions[0] in version["game_versions"]
+        return (exact, version["date_published"])
+
+    @staticmethod
+    def primary_file(version):
+        files = version["files"]
+        return next((f for f in files if f.get("primary")), files[0])
+
+    def fetch_projects(self, mod_slugs):
+        projects = {}
+        for project in self.get_bulk("projects", mod_slugs, METADATA_TTL_PROJECTS):
+            projects[project["slug"]] = project
+            projects[project["id"]] = project
+        return projects
+
+    def fetch_versions(self, version_ids):
+        versions = {}
+        missing = version_ids
+        if self.metadata_cache:
+            missing = []
+            for version_id in version_ids:
+                version = self.metadata_cache.get_item("modrinth-version", version_id, METADATA_TTL_VERSIONS)
+                if version is None:
+                    missing.append(version_id)
+                else:
+                    versions[version_id] = version
+
+        for version in self.get_bulk("versions", missing):
+            versions[version["id"]] = version
+            if self.metadata_cache:
+                self.metadata_cache.put_item("modrinth-version", version["id"], version)
+        return versions
+
+    def get_bulk(self, endpoint, ids, ttl=None):
+        # ttl caches the whole response by URL; without it the call always hits the API
+        results = []
+        for start in range(0, len(ids), self.chunk_size):
+            chunk = ids[start:start + self.chunk_size]
+            url = f"{self.api_url}/{endpoint}"
+            params = {"ids": json.dumps(chunk)}
+            if self.metadata_cache and ttl is not None:
+                results.extend(self.metadata_cache.get_json(url, ttl, params=params))
+                continue
+            if self.metadata_cache and self.metadata_cache.offline:
+                raise MetadataUnavailableError(f"Offline and not cached: {len(chunk)} {endpoint} from {url}")
+            response = get_session().get(url, params=params)
+            response.raise_for_status()
+            results.extend(response.json())
+        return results
@@ -0,0 +1,290 @@
+import json
+import mmap
+import os
+import struct
+import zlib
+from concurrent.futures import ProcessPoolExecutor
+from config import SCAN_POOL_MIN_JARS
+from logger import logger
+
+MOD_INDEX_FILE_NAME = "mcinstaller-mod-index.json"
+MOD_INDEX_VERSION = 1
+
+# Provided by the game and Fabric Loader itself rather than by a jar in mods/
+BUILTIN_MOD_IDS = {"minecraft", "java", "fabricloader", "fabric-loader", "mixinextras"}
+
+EOCD_SIGNATURE = b"PK\x05\x06"
+ZIP64_LOCATOR_SIGNATURE = b"PK\x06\x07"
+ZIP64_EOCD_SIGNATURE = b"PK\x06\x06"
+CENTRAL_HEADER_SIGNATURE = b"PK\x01\x02"
+LOCAL_HEADER_SIGNATURE = b"PK\x03\x04"
+EOCD_SIZE = 22
+MAX_COMMENT_SIZE = 0xFFFF
+
+
+class CorruptJarError(Exception):
+    pass
+
+
+def central_directory(data):
+    # (offset, size) of the zip central directory, found from the end of
+    # central directory record at the end of the archive
+    tail_start = max(0, len(data) - EOCD_SIZE - MAX_COMMENT_SIZE)
+    eocd = data.rfind(EOCD_SIGNATURE, tail_start)
+    if eocd < 0 or eocd + EOCD_SIZE > len(data):
+        raise CorruptJarError("end of central directory not found")
+    count, cd_size, cd_offset = struct.unpack("<HII", data[eocd + 10:eocd + 20])
+
+    if 0xFFFFFFFF in (cd_size, cd_offset) or count == 0xFFFF:
+        locator = eocd - 20
+        if locator < 0 or data[locator:locator + 4] != ZIP64_LOCATOR_SIGNATURE:
+            raise CorruptJarError("zip64 locator not found")
+        (zip64_offset,) = struct.unpack("<Q", data[locator + 8:locator + 16])
+        if data[zip64_offset:zip64_offset + 4] != ZIP64_EOCD_SIGNATURE:
+            raise CorruptJarError("zip64 end of central directory not found")
+        count, cd_size, cd_offset = struct.unpack("<QQQ", data[zip64_offset + 32:zip64_offset + 56])
+
+    if cd_offset + cd_size > len(data):
+        raise CorruptJarError("central directory runs past the end of the file")
+    if count and data[cd_offset:cd_offset + 4] != CENTRAL_HEADER_SIGNATURE:
+        raise CorruptJarError("bad central directory entry")
+    return cd_offset, cd_size
+
+
+def find_entry(data, directory, name):
+    # Locate name's central directory record by searching for the name
+    # bytes instead of walking every record; mod jars have thousands of
+    # entries and only a few are needed. Returns (compression, crc32,
+    # compressed_size, local_header_offset) or None.
+    cd_offset, cd_size = directory
+    needle = name.encode("utf-8")
+    end = cd_offset + cd_size
+    position = data.find(needle, cd_offset, end)
+    while position >= 0:
+        header = position - 46
+        if header >= cd_offset and data[header:header + 4] == CENTRAL_HEADER_SIGNATURE:
+            (compression, _, _, crc, compressed_size, _, name_length, extra_length,
+             _, _, _, _, local_offset) = struct.unpack("<HHHIIIHHHHHII", data[header + 10:header + 46])
+            if name_length == len(needle):
+                if 0xFFFFFFFF in (compressed_size, local_offset):
+                    extra = data[position + name_length:position + name_length + extra_length]
+                    compressed_size, local_offset = read_zip64_extra(extra, compressed_size, local_offset)
+                return compression, crc, compressed_size, local_offset
+        position = data.find(needle, position + 1, end)
+    return None
+
+
+def read_zip64_extra(extra, compressed_size, local_offset):
+    # The zip64 extra field holds, in order, only the sizes/offset that
+    # overflowed: uncompressed size, compressed size, local header offset
+    position = 0
+    while position + 4 <= len(extra):
+        header_id, size = struct.unpack("<HH", extra[position:position + 4])
+        if header_id == 0x0001:
+            values = iter(struct.unpack(f"<{size // 8}Q", extra[position + 4:position + 4 + size // 8 * 8]))
+            next(values, None)  # uncompressed size is always present first when needed
+            if compressed_size == 0xFFFFFFFF:
+                compressed_size = next(values)
+            if local_offset == 0xFFFFFFFF:
+                local_offset = next(values)
+            break
+        position += 4 + size
+    return compressed_size, local_offset
+
+
+def read_entry(data, entry):
+    compression, crc, compressed_size, local_offset = entry
+    if data[local_offset:local_offset + 4] != LOCAL_HEADER_SIGNATURE:
+        raise CorruptJarError("bad local file header")
+    name_length, extra_length = struct.unpack("<HH", data[local_offset + 26:local_offset + 30])
+    start = local_offset + 30 + name_length + extra_length
+    raw = data[start:start + compressed_size]
+    if len(raw) != compressed_size:
+        raise CorruptJarError("entry runs past the end of the file")
+    if compression == 0:
+        content = bytes(raw)
+    elif compression == 8:
+        try:
+            content = zlib.decompress(raw, -15)
+        except zlib.error as e:
+            raise CorruptJarError(f"cannot inflate entry: {str(e)}")
+    else:
+        raise CorruptJarError(f"unsupported compression method {compression}")
+    if zlib.crc32(content) != crc:
+        raise CorruptJarError("entry fails its CRC check")
+    return content
+
+
+def read_mod_metadata(data, nested=True):
+    # fabric.mod.json of the archive in data plus, one level deep, of the
+    # jars it bundles under "jars" (those count as provided mods)
+    directory = central_directory(data)
+    entry = find_entry(data, directory, "fabric.mod.json")
+    if entry is None:
+        return None
+    try:
+        # Some mods ship raw control characters inside strings
+        metadata = json.loads(read_entry(data, entry), strict=False)
+    except ValueError as e:
+        raise CorruptJarError(f"fabric.mod.json is not valid JSON: {str(e)}")
+    if not isinstance(metadata, dict):
+        raise CorruptJarError("fabric.mod.json is not a JSON object")
+    # Fabric Loader refuses these too; report them here rather than let
+    # them blow up the report with a TypeError
+    if not isinstance(metadata.get("id"), str):
+        raise CorruptJarError("fabric.mod.json has no string \"id\"")
+    for key, kind, kind_name in (("depends", dict, "object"), ("provides", list, "array"), ("jars", list, "array")):
+        if key in metadata and not isinstance(metadata[key], kind):
+            raise CorruptJarError(f"fabric.mod.json \"{key}\" is not a JSON {kind_name}")
+    if not all(isinstance(mod_id, str) for mod_id in metadata.get("provides", [])):
+        raise CorruptJarError("fabric.mod.json \"provides\" holds a non-string id")
+
+    provides = list(metadata.get("provides", []))
+    if nested:
+        for jar in metadata.get("jars", []):
+            if not isinstance(jar, dict) or not isinstance(jar.get("file"), str):
+                continue
+            entry = find_entry(data, directory, jar["file"])
+            if entry is None:
+                continue
+            nested_metadata = read_mod_metadata(read_entry(data, entry), nested=False)
+            if nested_metadata:
+                provides.append(nested_metadata["id"])
+                provides.extend(nested_metadata["provides"])
+
+    depends = metadata.get("depends", {})
+    return {
+        "id": metadata.get("id"),
+        "version": metadata.get("version"),
+        "depends": {mod_id: depends[mod_id] for mod_id in depends},
+        "provides": provides,
+    }
+
+
+def scan_jar(path):
+    # Runs in a worker process; everything it returns must be JSON-friendly
+    stat = os.stat(path)
+    result = {
+        "filename": os.path.basename(path),
+        "size": stat.st_size,
+        "mtime_ns": stat.st_mtime_ns,
+        "error": None,
+        "mod": None,
+    }
+    try:
+        with open(path, "rb") as file:
+            if stat.st_size == 0:
+                raise CorruptJarError("empty file")
+            with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as data:
+                result["mod"] = read_mod_metadata(data)
+    except (CorruptJarError, struct.error, ValueError, OSError) as e:
+        result["error"] = str(e)
+    return result
+
+
+class ModScanner:
+    # Indexes the jars in a mods/ folder and reports duplicate mod ids,
+    # corrupt archives and unmet "depends". Only the zip central directory
+    # and fabric.mod.json of each jar are read, and jars whose size and
+    # mtime match the cached index are not opened at all.
+
+    def __init__(self, mods_dir, index_path=None):
+        self.mods_dir = mods_dir
+        self.index_path = index_path or os.path.join(os.path.dirname(mods_dir), MOD_INDEX_FILE_NAME)
+
+    def load_index(self):
+        try:
+            with open(self.index_path, "r") as file:
+                data = json.load(file)
+        except (OSError, ValueError):
+            return {}
+        if data.get("version") != MOD_INDEX_VERSION:
+            return {}
+        return data.get("jars", {})
+
+    def save_index(self, jars):
+        tmp_path = f"{self.index_path}.tmp"
+        with open(tmp_path, "w") as file:
+            json.dump({"version": MOD_INDEX_VERSION, "jars": jars}, file)
+        os.replace(tmp_path, self.index_path)
+
+    def scan(self):
+        cached = self.load_index()
+        jars = {}
+        pending = []
+        try:
+            names = sorted(f for f in os.listdir(self.mods_dir) if f.endswith(".jar"))
+        except FileNotFoundError:
+            names = []
+        for name in names:
+            path = os.path.join(self.mods_dir, name)
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            entry = cached.get(name)
+            if entry and entry["size"] == stat.st_size and entry["mtime_ns"] == stat.st_mtime_ns:
+                jars[name] = entry
+            else:
+                pending.append(path)
+
+        # Worker processes cost more to start than a handful of jars take to scan
+        if len(pending) >= SCAN_POOL_MIN_JARS:
+            with ProcessPoolExecutor() as executor:
+                results = list(executor.map(scan_jar, pending, chunksize=8))
+        else:
+            results = [scan_jar(path) for path in pending]
+        for result in results:
+            jars[result["filename"]] = result
+
+        if pending or len(jars) != len(cached):
+            self.save_index(jars)
+        return self.report(jars)
+
+    @staticmethod
+    def report(jars):
+        corrupt = {name: jar["error"] for name, jar in jars.items() if jar["error"]}
+        not_mods = sorted(name for name, jar in jars.items() if not jar["error"] and jar["mod"] is None)
+
+        owners = {}
+        provided = set(BUILTIN_MOD_IDS)
+        for name, jar in sorted(jars.items()):
+            mod = jar["mod"]
+            if mod is None:
+                continue
+            owners.setdefault(mod["id"], []).append(name)
+            provided.add(mod["id"])
+            provided.update(mod["provides"])
+        duplicates = {mod_id: names for mod_id, names in owners.items() if len(names) > 1}
+
+        # Only presence is checked; version ranges are left to Fabric Loader
+        unmet = {}
+        for name, jar in sorted(jars.items()):
+            mod = jar["mod"]
+            if mod is None:
+                continue
+            missing = sorted(mod_id for mod_id in mod["depends"] if mod_id not in provided)
+            if missing:
+                unmet[mod["id"]] = missing
+
+        return {
+            "mods": {jar["mod"]["id"]: jar["mod"]["version"] for jar in jars.values() if jar["mod"]},
+            "duplicates": duplicates,
+            "corrupt": corrupt,
+            "not_mods": not_mods,
+            "unmet_depends": unmet,
+        }
+
+    @staticmethod
+    def log_report(report):
+        for mod_id, names in report["duplicates"].items():
+            logger.warning(f"Duplicate mod {mod_id}: {', '.join(names)}")
+        for name, error in report["corrupt"].items():
+            logger.warning(f"Corrupt jar {name}: {error}")
+        for name in report["not_mods"]:
+            logger.warning(f"Not a Fabric mod: {name}")
+        for mod_id, missing in report["unmet_depends"].items():
+            logger.warning(f"{mod_id} depends on missing mods: {', '.join(missing)}")
+        problems = report["duplicates"] or report["corrupt"] or report["unmet_depends"]
+        if not problems:
+            logger.info(f"Scanned {len(report['mods'])} mods, no problems found")
@@ -0,0 +1,109 @@
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from logger import logger
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+
+class ProfileStoreError(Exception):
+    pass
+
+
+class ProfileStore:
+    # Read-modify-write access to launcher_profiles.json. Writers serialise
+    # on a lock file next to it and re-read the file under the lock, so
+    # concurrent installs never drop each other's profiles. The new content
+    # is written to a temp file and renamed over the original, so the
+    # launcher never sees a half-written file. Upserts made inside batch()
+    # are applied together with a single rewrite.
+
+    def __init__(self, path):
+        self.path = path
+        self.lock_path = f"{path}.lock"
+        self.pending = None
+        self.pending_lock = threading.Lock()
+
+    @contextmanager
+    def locked(self):
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        with open(self.lock_path, "a+") as lock_file:
+            if fcntl:
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX)
+            else:
+                while True:
+                    try:
+                        lock_file.seek(0)
+                        msvcrt.locking(lock_file.fileno(), msvcrt.LK_LOCK, 1)
+                        break
+                    except OSError:
+                        # LK_LOCK gives up after about ten seconds; keep waiting
+                        time.sleep(0.1)
+            try:
+                yield
+            finally:
+                if fcntl:
+                    fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
+                else:
+                    lock_file.seek(0)
+                    msvcrt.locking(lock_file.fileno(), msvcrt.LK_UNLCK, 1)
+
+    def load(self):
+        try:
+            with open(self.path, "r", encoding="utf-8") as file:
+                return json.load(file)
+        except FileNotFoundError:
+            return {}
+        except ValueError as e:
+            # Never replace a file we could not parse; it holds the user's profiles
+            raise ProfileStoreError(f"Cannot parse {self.path}: {str(e)}")
+
+    def save(self, data):
+        tmp_path = f"{self.path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            with open(tmp_path, "w", encoding="utf-8") as file:
+                json.dump(data, file, indent=2)
+                file.flush()
+                os.fsync(file.fileno())
+            os.replace(tmp_path, self.path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+    def upsert(self, key, profile):
+        with self.pending_lock:
+            if self.pending is not None:
+                self.pending[key] = profile
+                return
+        self.upsert_many({key: profile})
+
+    def upsert_many(self, profiles):
+        with self.locked():
+            data = self.load()
+            data.setdefault("profiles", {}).update(profiles)
+            self.save(data)
+        logger.info(f"Wrote {len(profiles)} profile(s) to {self.path}")
+
+    @contextmanager
+    def batch(self):
+        # Profiles upserted inside the block are written once on exit, also
+        # when the block raises, so completed installs keep their profiles
+        with self.pending_lock:
+            outer = self.pending is not None
+            if not outer:
+                self.pending = {}
+        try:
+            yield self
+        finally:
+            if not outer:
+                with self.pending_lock:
+                    pending, self.pending = self.pending, None
+                if pending:
+                    self.upsert_many(pending)
@@ -0,0 +1,137 @@
+import json
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import types
+import unittest
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlparse, parse_qs
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+try:
+    import secret  # noqa: F401
+except ImportError:
+    # The stand-in server does not check tokens
+    sys.modules["secret"] = types.SimpleNamespace(GITHUB_TOKEN="test")
+
+from mod_resolver import ModResolver  # noqa: E402
+from metadata_cache import MetadataCache, MetadataUnavailableError  # noqa: E402
+
+GAME_VERSION = "1.21.1"
+VERSIONS_PER_MOD = 5
+
+
+class FakeModrinth:
+    # Local stand-in for Modrinth's /projects and /versions bulk endpoints
+    # that counts the requests it receives
+
+    def __init__(self, mod_count):
+        self.projects = {}
+        self.versions = {}
+        self.requests = 0
+        self.lock = threading.Lock()
+        for i in range(mod_count):
+            slug = f"mod-{i}"
+            version_ids = [f"v{i}-{j}" for j in range(VERSIONS_PER_MOD)]
+            self.projects[slug] = {
+                "id": f"p{i}",
+                "slug": slug,
+                "versions": version_ids,
+                "game_versions": [GAME_VERSION],
+            }
+            for j, version_id in enumerate(version_ids):
+                self.versions[version_id] = {
+                    "id": version_id,
+                    "project_id": f"p{i}",
+                    "loaders": ["fabric"],
+                    "game_versions": [GAME_VERSION],
+                    "date_published": f"2024-01-01T00:00:0{j}Z",
+                    "dependencies": [],
+                    "files": [{"url": "http://example.invalid/a.jar", "filename": f"{slug}-{j}.jar", "primary": True}],
+                }
+
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def do_GET(self):
+                url = urlparse(self.path)
+                ids = json.loads(parse_qs(url.query)["ids"][0])
+                table = fake.projects if url.path.endswith("/projects") else fake.versions
+                body = json.dumps([table[i] for i in ids if i in table]).encode()
+                with fake.lock:
+                    fake.requests += 1
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self.thread.start()
+        self.api_url = f"http://127.0.0.1:{self.httpd.server_port}/v2"
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+class ResolveRequestCountTest(unittest.TestCase):
+    def setUp(self):
+        self.server = FakeModrinth(30)
+
+    def tearDown(self):
+        self.server.stop()
+
+    def resolve_counting(self, slugs):
+        before = self.server.requests
+        resolved = ModResolver(self.server.api_url).resolve(slugs, [GAME_VERSION])
+        self.assertTrue(all(version is not None for version in resolved.values()))
+        return self.server.requests - before
+
+    def test_request_count_does_not_grow_with_mod_count(self):
+        few = self.resolve_counting([f"mod-{i}" for i in range(3)])
+        many = self.resolve_counting([f"mod-{i}" for i in range(30)])
+        self.assertEqual(few, 2)  # one /projects and one /versions call
+        self.assertEqual(many, few)
+
+    def test_picks_newest_matching_version(self):
+        resolved = ModResolver(self.server.api_url).resolve(["mod-0"], [GAME_VERSION])
+        self.assertEqual(resolved["mod-0"]["id"], f"v0-{VERSIONS_PER_MOD - 1}")
+
+
+class OfflineResolveTest(unittest.TestCase):
+    def setUp(self):
+        self.server = FakeModrinth(3)
+        self.cache_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        self.server.stop()
+        shutil.rmtree(self.cache_dir)
+
+    def resolver(self, offline):
+        return ModResolver(self.server.api_url, metadata_cache=MetadataCache(self.cache_dir, offline=offline))
+
+    def test_offline_uses_only_the_cache(self):
+        slugs = [f"mod-{i}" for i in range(3)]
+        online = self.resolver(False).resolve(slugs, [GAME_VERSION])
+        before = self.server.requests
+        offline = self.resolver(True).resolve(slugs, [GAME_VERSION])
+        self.assertEqual(offline, online)
+        self.assertEqual(self.server.requests, before)
+
+    def test_offline_versions_missing_from_the_cache(self):
+        # The compatibility matrix asks for every version of a mod, most of
+        # which an install never fetched
+        with self.assertRaises(MetadataUnavailableError):
+            self.resolver(True).fetch_versions(["v0-0", "v0-1"])
+        self.assertEqual(self.server.requests, 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
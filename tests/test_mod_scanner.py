@@ -0,0 +1,172 @@
+import io
+import json
+import os
+import shutil
+import struct
+import sys
+import tempfile
+import types
+import unittest
+import zipfile
+from unittest import mock
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+try:
+    import secret  # noqa: F401
+except ImportError:
+    # config imports it; the scanner never talks to GitHub
+    sys.modules["secret"] = types.SimpleNamespace(GITHUB_TOKEN="test")
+
+from mod_scanner import ModScanner, CorruptJarError, EOCD_SIGNATURE, read_mod_metadata, scan_jar  # noqa: E402
+
+
+def make_jar(metadata=None, extra=None, compression=zipfile.ZIP_DEFLATED, nested=None):
+    # metadata: dict dumped as fabric.mod.json, or a str written as-is
+    jar = io.BytesIO()
+    with zipfile.ZipFile(jar, "w", compression) as z:
+        for name, content in (extra or {}).items():
+            z.writestr(name, content)
+        for name, content in (nested or {}).items():
+            z.writestr(name, content)
+        if metadata is not None:
+            z.writestr("fabric.mod.json", metadata if isinstance(metadata, str) else json.dumps(metadata))
+    return jar.getvalue()
+
+
+def make_zip64_jar(metadata):
+    # zipfile only writes zip64 records for archives past 4 GiB or 65535
+    # entries; lowering the limit gets the same structures in a small file
+    with mock.patch("zipfile.ZIP64_LIMIT", 0):
+        data = bytearray(make_jar(metadata, extra={"assets/a.txt": "a" * 1000, "assets/b.txt": "b" * 1000}))
+    # ...and still keeps the real values in the classic end record, which an
+    # archive that size could not; mask them so only the zip64 record is usable
+    eocd = data.rfind(EOCD_SIGNATURE)
+    data[eocd + 8:eocd + 20] = struct.pack("<HHII", 0xFFFF, 0xFFFF, 0xFFFFFFFF, 0xFFFFFFFF)
+    data = bytes(data)
+    with zipfile.ZipFile(io.BytesIO(data)) as z:
+        assert z.testzip() is None
+    return data
+
+
+class ReadModMetadataTest(unittest.TestCase):
+    def test_reads_id_version_depends_provides(self):
+        data = make_jar({"id": "a", "version": "1.0", "depends": {"b": "*"}, "provides": ["a-api"]})
+        self.assertEqual(read_mod_metadata(data), {
+            "id": "a", "version": "1.0", "depends": {"b": "*"}, "provides": ["a-api"],
+        })
+
+    def test_stored_entries(self):
+        data = make_jar({"id": "a", "version": "1"}, compression=zipfile.ZIP_STORED)
+        self.assertEqual(read_mod_metadata(data)["id"], "a")
+
+    def test_nested_jars_count_as_provided(self):
+        inner = make_jar({"id": "inner", "version": "1", "provides": ["inner-api"]})
+        data = make_jar(
+            {"id": "outer", "version": "1", "jars": [{"file": "META-INF/jars/inner.jar"}, "bad", {"file": 3}]},
+            nested={"META-INF/jars/inner.jar": inner},
+        )
+        self.assertEqual(read_mod_metadata(data)["provides"], ["inner", "inner-api"])
+
+    def test_not_a_mod(self):
+        self.assertIsNone(read_mod_metadata(make_jar(extra={"a.class": b"\xca\xfe"})))
+
+    def test_zip64(self):
+        data = make_zip64_jar({"id": "big", "version": "2", "depends": {"c": "*"}})
+        self.assertEqual(read_mod_metadata(data)["id"], "big")
+        self.assertEqual(read_mod_metadata(data)["depends"], {"c": "*"})
+
+    def test_malformed_metadata(self):
+        cases = {
+            "not json": "{",
+            "not an object": "[1, 2]",
+            "string": '"a"',
+            "no id": {"version": "1"},
+            "id not a string": {"id": ["a"]},
+            "depends list": {"id": "a", "depends": ["b"]},
+            "depends null": {"id": "a", "depends": None},
+            "provides object": {"id": "a", "provides": {"b": 1}},
+            "provides non-string": {"id": "a", "provides": [{"b": 1}]},
+            "jars object": {"id": "a", "jars": {"file": "x.jar"}},
+        }
+        for name, metadata in cases.items():
+            with self.subTest(name):
+                with self.assertRaises(CorruptJarError):
+                    read_mod_metadata(make_jar(metadata))
+
+
+class ScanJarTest(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def scan(self, data):
+        path = os.path.join(self.dir, "mod.jar")
+        with open(path, "wb") as file:
+            file.write(data)
+        return scan_jar(path)
+
+    def test_empty_file(self):
+        self.assertEqual(self.scan(b"")["error"], "empty file")
+
+    def test_truncated(self):
+        data = make_jar({"id": "a", "version": "1"}, extra={"payload.bin": os.urandom(4096)})
+        for length in (10, len(data) // 2, len(data) - 5):
+            with self.subTest(length=length):
+                result = self.scan(data[:length])
+                self.assertIsNotNone(result["error"])
+                self.assertIsNone(result["mod"])
+
+    def test_corrupt_entry_data(self):
+        metadata = json.dumps({"id": "a", "version": "1", "description": "x" * 500})
+        data = bytearray(make_jar(metadata, compression=zipfile.ZIP_STORED))
+        start = bytes(data).index(b"xxxx")
+        data[start:start + 4] = b"yyyy"
+        self.assertIn("CRC", self.scan(bytes(data))["error"])
+
+    def test_garbage(self):
+        self.assertIsNotNone(self.scan(os.urandom(1000))["error"])
+
+
+class ModScannerTest(unittest.TestCase):
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.mods_dir = os.path.join(self.root, "mods")
+        os.makedirs(self.mods_dir)
+
+    def tearDown(self):
+        shutil.rmtree(self.root)
+
+    def add(self, name, data):
+        with open(os.path.join(self.mods_dir, name), "wb") as file:
+            file.write(data)
+
+    def test_report(self):
+        self.add("a-1.jar", make_jar({"id": "a", "version": "1", "depends": {"fabricloader": "*", "b": "*"}}))
+        self.add("a-2.jar", make_jar({"id": "a", "version": "2"}))
+        self.add("c.jar", make_jar({"id": "c", "version": "1", "depends": {"a": "*", "missing": "*"}}))
+        self.add("broken.jar", b"PK\x03\x04 not really a jar")
+        self.add("bad-depends.jar", make_jar({"id": "d", "depends": ["a"]}))
+        self.add("library.jar", make_jar(extra={"lib.class": b"\xca\xfe"}))
+        self.add("big.jar", make_zip64_jar({"id": "big", "version": "1"}))
+        self.add("readme.txt", b"not scanned")
+
+        report = ModScanner(self.mods_dir).scan()
+        self.assertEqual(report["duplicates"], {"a": ["a-1.jar", "a-2.jar"]})
+        self.assertEqual(sorted(report["corrupt"]), ["bad-depends.jar", "broken.jar"])
+        self.assertEqual(report["not_mods"], ["library.jar"])
+        self.assertEqual(report["unmet_depends"], {"a": ["b"], "c": ["missing"]})
+        self.assertEqual(report["mods"]["big"], "1")
+
+    def test_unchanged_jars_come_from_the_index(self):
+        self.add("a.jar", make_jar({"id": "a", "version": "1"}))
+        ModScanner(self.mods_dir).scan()
+        with mock.patch("mod_scanner.scan_jar") as scan_jar_mock:
+            report = ModScanner(self.mods_dir).scan()
+        scan_jar_mock.assert_not_called()
+        self.assertEqual(report["mods"], {"a": "1"})
+
+
+if __name__ == "__main__":
+    unittest.main()